@@ -0,0 +1,184 @@
+# backends.py
+
+import json
+import random
+import time
+from collections import deque
+import openai
+from player import ROUTE, estimate_tokens
+from ratelimit import LimitedClient
+
+# failures that say nothing about the request itself: try the next backend
+FAILOVER = (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError, openai.RateLimitError)
+PHASES = ("setup", "turn_start", "continue", "retry")
+
+
+class Backend:
+    """
+    One OpenAI-compatible chat-completions endpoint: the OpenAI API or a local
+    server (llama.cpp, vLLM, Ollama, the mock ...). `model` replaces the
+    player's model and `temperature`, if set, its temperature; prompts over
+    `max_prompt_tokens` (a small local context window) are not sent here.
+    Keeps the latency and outcome of its last `window` calls.
+    """
+
+    def __init__(self, name: str, model: str = None, base_url: str = None, api_key: str = None,
+                 temperature: float = None, max_prompt_tokens: int = None, window: int = 50):
+        self.name = name
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.temperature = temperature
+        self.max_prompt_tokens = max_prompt_tokens
+        self.client = None
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)     # True for a reply, False for a failure
+
+    def connect(self, default_client):
+        """Use `default_client` (the pooled, possibly rate-limited one) unless this backend has its own URL."""
+        if self.base_url is None:
+            self.client = default_client
+        else:
+            # one SDK retry; beyond that the router fails over to the next backend
+            self.client = openai.AsyncOpenAI(api_key=self.api_key or "local", base_url=self.base_url,
+                                             max_retries=1)
+
+    def observe(self, seconds: float, ok: bool):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(seconds)
+
+    @property
+    def p50(self) -> float:
+        values = sorted(self.latencies)
+        return values[len(values) // 2] if values else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    @property
+    def cost(self) -> float:
+        """Expected seconds per reply: p50 latency over the success rate (infinite if every call failed)."""
+        success = 1 - self.error_rate
+        return self.p50 / success if success > 0 else float("inf")
+
+    def fits(self, prompt_tokens: int) -> bool:
+        return self.max_prompt_tokens is None or prompt_tokens <= self.max_prompt_tokens
+
+
+class Router:
+    """
+    Picks a backend per request. `routes` maps "<player>:<phase>", "<phase>",
+    "<player>" or "default" to backend names (the most specific key wins;
+    phases are PHASES). Among the candidates that fit the prompt, each is
+    tried `explore` times first; after that they are ranked by expected time
+    per reply (Backend.cost: p50 latency and error rate), with an occasional
+    (`epsilon`) random pick so stale numbers, like a backend that was down,
+    get refreshed. The rest of the ranking is the failover order.
+    """
+
+    def __init__(self, backends: list, routes: dict = None, explore: int = 3, epsilon: float = 0.05,
+                 seed: int = None):
+        self.backends = {b.name: b for b in backends}
+        self.routes = routes or {"default": [b.name for b in backends]}
+        for names in self.routes.values():
+            for name in names:
+                if name not in self.backends:
+                    raise ValueError(f"route uses unknown backend {name!r}")
+        self.explore = explore
+        self.epsilon = epsilon
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Router":
+        """
+        A router from a JSON file:
+        {"backends": {"<name>": {"model": ..., "base_url": ..., ...}, ...},
+         "routes": {"default": ["<name>", ...], "setup": [...], "Player2": [...]}}
+        """
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+        backends = [Backend(name, **fields) for name, fields in spec["backends"].items()]
+        return cls(backends, spec.get("routes"))
+
+    def candidates(self, player: str, phase: str) -> list:
+        for key in (f"{player}:{phase}", phase, player, "default"):
+            if key in self.routes:
+                return [self.backends[name] for name in self.routes[key]]
+        return list(self.backends.values())
+
+    def ranked(self, player: str, phase: str, prompt_tokens: int) -> list:
+        backends = [b for b in self.candidates(player, phase) if b.fits(prompt_tokens)]
+        if not backends:
+            raise ValueError(f"no backend for {player} ({phase}) takes a {prompt_tokens}-token prompt")
+        ranked = sorted(backends, key=lambda b: (len(b.outcomes) >= self.explore, b.cost))
+        if len(ranked) > 1 and self.rng.random() < self.epsilon:
+            ranked.insert(0, ranked.pop(self.rng.randrange(1, len(ranked))))
+        return ranked
+
+    def bind(self, client) -> "RoutedClient":
+        for backend in self.backends.values():
+            backend.connect(client)
+        return RoutedClient(self)
+
+    async def close(self):
+        for backend in self.backends.values():
+            if backend.base_url is not None and backend.client is not None:
+                await backend.client.close()
+
+    def summary(self) -> str:
+        lines = ["backend      calls   p50 s  errors"]
+        for b in self.backends.values():
+            lines.append(f"{b.name:<12}{len(b.outcomes):>6}{b.p50:>8.2f}{b.error_rate:>8.0%}")
+        return "\n".join(lines)
+
+
+class RoutedClient:
+    """
+    Drop-in for the AsyncOpenAI client in the game loops (chat.completions.create).
+    Each request goes to the router's first choice for the calling player and
+    phase (player.ROUTE), failing over down the ranking on connection, timeout,
+    server and rate-limit errors; the backend used is written back to the route.
+    For streamed replies, the latency is the time to the first response headers.
+    """
+
+    def __init__(self, router: Router):
+        self.router = router
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **body):
+        route = ROUTE.get() or {}
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in body.get("messages", []))
+        error = None
+        for backend in self.router.ranked(route.get("player"), route.get("phase"), prompt_tokens):
+            request = dict(body)
+            if backend.model:
+                request["model"] = backend.model
+            if backend.temperature is not None:
+                request["temperature"] = backend.temperature
+            started = time.monotonic()
+            try:
+                resp = await backend.client.chat.completions.create(**request)
+            except FAILOVER as e:
+                backend.observe(time.monotonic() - started, False)
+                error = e
+                continue
+            backend.observe(time.monotonic() - started, True)
+            route["backend"] = backend.name
+            return resp
+        raise error
+
+
+def load_router(path: str) -> Router:
+    """Router.from_file(path), or None without a path."""
+    return Router.from_file(path) if path else None
+
+
+def route_client(client, router: Router):
+    if router is None:
+        return client
+    if isinstance(client, LimitedClient):
+        client.failover = True     # a 429 moves on to the next backend instead of waiting
+    return router.bind(client)
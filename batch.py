@@ -0,0 +1,203 @@
+# batch.py
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import openai
+from openai.types.chat import ChatCompletion
+from config import OPENAI_API_KEY, OPENAI_BASE_URL
+from client import get_async_client, close_async_client
+from engine import run_games, config_specs, VARIANTS
+
+ENDPOINT = "/v1/chat/completions"
+FINAL_STATES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchError(RuntimeError):
+    """A request line came back from the batch with an error instead of a completion."""
+
+
+class LocalBatch:
+    """
+    Stand-in for the Batch API: runs each line of the input file against
+    `client` (e.g. the mock server), at most `concurrency` at a time, and
+    writes the output file in the Batch API's format.
+    """
+
+    def __init__(self, client, concurrency: int = 50):
+        self.client = client
+        self.concurrency = concurrency
+
+    async def run(self, path: str) -> str:
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def one(line):
+            async with limit:
+                try:
+                    resp = await self.client.chat.completions.create(**line["body"])
+                    return {"custom_id": line["custom_id"], "error": None,
+                            "response": {"status_code": 200, "body": resp.model_dump()}}
+                except openai.APIError as e:
+                    return {"custom_id": line["custom_id"], "response": None,
+                            "error": {"code": type(e).__name__, "message": str(e)}}
+
+        results = await asyncio.gather(*(one(line) for line in lines))
+        out = path.replace(".jsonl", ".out.jsonl")
+        with open(out, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in results)
+        return out
+
+
+class OpenAIBatch:
+    """Submits the input file to the Batch API and polls every `poll` seconds until it is done."""
+
+    def __init__(self, client, poll: float = 15.0, window: str = "24h"):
+        self.client = client
+        self.poll = poll
+        self.window = window
+
+    async def run(self, path: str) -> str:
+        with open(path, "rb") as f:
+            upload = await self.client.files.create(file=f, purpose="batch")
+        batch = await self.client.batches.create(input_file_id=upload.id, endpoint=ENDPOINT,
+                                                 completion_window=self.window)
+        while batch.status not in FINAL_STATES:
+            await asyncio.sleep(self.poll)
+            batch = await self.client.batches.retrieve(batch.id)
+        if batch.status != "completed":
+            raise BatchError(f"batch {batch.id} {batch.status}: {batch.errors}")
+        text = ""
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                text += (await self.client.files.content(file_id)).text
+        out = path.replace(".jsonl", ".out.jsonl")
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text)
+        return out
+
+
+class BatchClient:
+    """
+    Drop-in for the AsyncOpenAI client in the game loops (chat.completions.create
+    only). Requests are held until each of the `games` that hasn't finished
+    (see finish) is waiting on its next reply, or, as a safety net, until none
+    has been added for `window` seconds; they are then written to one JSONL
+    file in `work_dir`, run through `backend` (LocalBatch or OpenAIBatch), and
+    each game gets its own completion back. The games thus advance in
+    lockstep, one batch per step. Without `games` only the window applies.
+    """
+
+    def __init__(self, backend, work_dir: str = "batches", games: int = None, window: float = 2.0):
+        self.backend = backend
+        self.work_dir = work_dir
+        self.games = games
+        self.window = window
+        self.finished = 0
+        self.added = asyncio.Event()     # set on every new request or finished game
+        self.pending = []            # (custom_id, body, future)
+        self.steps = 0
+        self.requests = 0
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        self.flusher = None
+        self.chat = self
+        self.completions = self
+        os.makedirs(work_dir, exist_ok=True)
+
+    async def create(self, **body) -> ChatCompletion:
+        if body.get("stream"):
+            raise ValueError("batch mode can't stream replies")
+        future = asyncio.get_running_loop().create_future()
+        self.requests += 1
+        self.pending.append((f"req-{self.requests}", body, future))
+        self.added.set()
+        if self.flusher is None:
+            self.flusher = asyncio.create_task(self._flush())
+        return await future
+
+    def finish(self, game_id=None):
+        """Stop waiting for a game that has ended (engine.run_games' on_finish)."""
+        self.finished += 1
+        self.added.set()
+
+    def _step_ready(self) -> bool:
+        return self.games is not None and len(self.pending) >= self.games - self.finished
+
+    async def _flush(self):
+        # wait until every unfinished game has a request in, or none arrives for `window`
+        # seconds (a game busy elsewhere, e.g. backing off before a resume); then submit
+        while not self._step_ready():
+            self.added.clear()
+            try:
+                await asyncio.wait_for(self.added.wait(), self.window)
+            except asyncio.TimeoutError:
+                break
+        batch, self.pending, self.flusher = self.pending, [], None
+        self.steps += 1
+        path = os.path.join(self.work_dir, f"step-{self.steps:04d}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for custom_id, body, _ in batch:
+                line = {"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body}
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        try:
+            out = await self.backend.run(path)
+            with open(out, encoding="utf-8") as f:
+                results = {r["custom_id"]: r for r in map(json.loads, f)}
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        for custom_id, _, future in batch:
+            result = results.get(custom_id)
+            if result is None or result.get("error") or (result.get("response") or {}).get("status_code") != 200:
+                future.set_exception(BatchError(f"{custom_id}: {result and (result.get('error') or result.get('response'))}"))
+                continue
+            body = result["response"]["body"]
+            for key in self.usage:
+                self.usage[key] += (body.get("usage") or {}).get(key) or 0
+            future.set_result(ChatCompletion.model_validate(body))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many unattended games in lockstep through the Batch API")
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-turns", type=int, default=20)
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default="memory")
+    parser.add_argument("--local", action="store_true",
+                        help="run each batch directly against OPENAI_BASE_URL (e.g. the mock) instead of the Batch API")
+    parser.add_argument("--work-dir", default="batches", help="where the per-step JSONL files are written")
+    parser.add_argument("--poll", type=float, default=15.0, help="seconds between Batch API status checks")
+    parser.add_argument("--schema", action="store_true", help="schema-constrained replies")
+    args = parser.parse_args()
+
+    openai.api_key = OPENAI_API_KEY
+    api = get_async_client(OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+    backend = LocalBatch(api) if args.local else OpenAIBatch(api, args.poll)
+    client = BatchClient(backend, args.work_dir, games=args.games)
+
+    async def run():
+        try:
+            return await run_games(config_specs(args.games, args.seed), args.games, args.max_turns,
+                                   args.variant, client=client, schema=args.schema, on_finish=client.finish)
+        finally:
+            await close_async_client()
+
+    started = time.monotonic()
+    results = asyncio.run(run())
+    elapsed = time.monotonic() - started
+
+    errors = sum(1 for r in results if r["error"])
+    tokens = client.usage["prompt_tokens"] + client.usage["completion_tokens"]
+    print(f"{len(results)} games ({errors} failed) in {elapsed:.1f}s = {len(results) * 3600 / elapsed:.1f} games/hour")
+    print(f"{client.steps} batches, {client.requests} requests, "
+          f"{client.requests / max(client.steps, 1):.1f} requests per batch")
+    print(f"{tokens / max(len(results), 1):,.0f} tokens per game "
+          f"({client.usage['prompt_tokens']:,} prompt, {client.usage['completion_tokens']:,} completion)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# bench.py
+
+import os
+os.environ.setdefault("OPENAI_API_KEY", "mock")   # never used against the real API
+
+import argparse
+import asyncio
+import glob
+import tempfile
+import time
+from collections import defaultdict
+from engine import config_specs, run_games, VARIANTS
+from logger import LogReader
+from mockllm import MockServer, add_mock_args, settings_from_args
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+async def bench_variant(variant: str, server: MockServer, args) -> dict:
+    """Play the benchmark games for one player variant against the mock server."""
+    before = server.stats.snapshot()
+    log_dir = tempfile.mkdtemp(prefix=f"bench_{variant}_")
+    started = time.monotonic()
+    results = await run_games(config_specs(args.games, args.seed), args.concurrency, args.max_turns,
+                              variant, log_dir=log_dir, base_url=server.base_url, stream=args.stream,
+                              schema=args.schema)
+    elapsed = time.monotonic() - started
+    after = server.stats.snapshot()
+
+    reader = LogReader(log_dir)
+    latencies, first_outputs, actions = [], [], 0
+    turn_seconds = defaultdict(float)     # (game, turn) -> model time of all that turn's actions
+    for path in glob.glob(os.path.join(log_dir, "*.jsonl")):
+        if path.endswith("blocks.jsonl"):
+            continue
+        for record in reader.records(path):
+            if record["type"] == "RESPONSE":
+                latencies.append(record["latency"])
+                turn_seconds[record.get("game"), record.get("turn")] += record["latency"]
+                # without streaming, decisions are only seen once the whole reply is in
+                first_outputs.append(record.get("first_output_seconds") or record["latency"])
+                actions += 1
+            elif record["type"] == "ERROR":
+                actions += 1
+
+    calls = after["requests"] - before["requests"]
+    turns = sum(r["turns"] for r in results)
+    return {
+        "variant": variant,
+        "games": len(results),
+        "failed": sum(1 for r in results if r["error"]),
+        "turns/s": turns / elapsed,
+        "actions/s": actions / elapsed,
+        "turn p50 ms": 1000 * percentile(list(turn_seconds.values()), 50),
+        "turn p99 ms": 1000 * percentile(list(turn_seconds.values()), 99),
+        "action p50 ms": 1000 * percentile(latencies, 50),
+        "action p99 ms": 1000 * percentile(latencies, 99),
+        "p50 1st ms": 1000 * percentile(first_outputs, 50),
+        "prompt B/call": (after["prompt_bytes"] - before["prompt_bytes"]) / max(calls, 1),
+        "retry rate": (calls - actions) / max(actions, 1),
+        "retries saved": after["prevented"] - before["prevented"],
+    }
+
+
+def format_table(rows: list) -> str:
+    columns = list(rows[0])
+    lines = ["  ".join(f"{c:>13}" for c in columns)]
+    for row in rows:
+        lines.append("  ".join(
+            f"{row[c]:>13.2f}" if isinstance(row[c], float) else f"{row[c]:>13}" for c in columns
+        ))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline turn-loop benchmark against the mock LLM")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--max-turns", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stream", action="store_true", help="stream replies (see jsonstream.py)")
+    parser.add_argument("--schema", action="store_true", help="request schema-constrained replies")
+    parser.add_argument("--variants", nargs="+", choices=sorted(VARIANTS), default=sorted(VARIANTS))
+    add_mock_args(parser)
+    args = parser.parse_args()
+
+    rows = []
+    with MockServer(settings_from_args(args)) as server:
+        for variant in args.variants:
+            rows.append(asyncio.run(bench_variant(variant, server, args)))
+    print(format_table(rows))
+
+
+if __name__ == "__main__":
+    main()
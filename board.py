@@ -0,0 +1,192 @@
+# board.py
+
+from dataclasses import dataclass, field
+
+# actions the model may report, with the fields each one uses
+ACTION_HELP = (
+    '{"type": "play", "card": "<Basic Pokémon>", "hp": <max HP>, "to": "active" | "bench"}\n'
+    '{"type": "evolve", "card": "<Evolution>", "hp": <max HP>, "target": "active" | "bench:<i>"}\n'
+    '{"type": "attach", "energy": "<Energy type>", "target": "active" | "bench:<i>"}\n'
+    '{"type": "retreat", "bench": <i>, "discard_energy": <count>}  (also for Switch)\n'
+    '{"type": "attack", "name": "<attack>", "damage": <damage to the opponent\'s Active>}\n'
+    '{"type": "damage", "side": "self" | "opponent", "target": "active" | "bench:<i>", "amount": <n>}\n'
+    '{"type": "heal", "target": "active" | "bench:<i>", "amount": <n>}\n'
+    '{"type": "condition", "side": "self" | "opponent", "condition": "<Asleep/Burned/...>" | "none"}\n'
+    '{"type": "discard_energy", "target": "active" | "bench:<i>", "count": <n>}\n'
+    '{"type": "promote", "bench": <i>}  (after your Active is Knocked Out)'
+)
+
+
+class BoardError(ValueError):
+    """An action that can't be applied to the current board."""
+
+
+@dataclass(slots=True, eq=False)
+class Pokemon:
+    # eq=False: two copies of the same card in play are different Pokémon,
+    # so list.index/remove must match by identity, not by value
+    name: str
+    hp: int
+    damage: int = 0
+    energies: list = field(default_factory=list)
+    conditions: list = field(default_factory=list)
+
+    @property
+    def knocked_out(self) -> bool:
+        return self.damage >= self.hp
+
+    @property
+    def prize_value(self) -> int:
+        return 2 if self.name.endswith((" V", " GX", " EX", " ex")) else 1
+
+    def render(self) -> str:
+        text = f"{self.name} {max(self.hp - self.damage, 0)}/{self.hp}"
+        if self.energies:
+            text += " " + ",".join(self.energies)
+        if self.conditions:
+            text += " " + ",".join(self.conditions)
+        return text
+
+
+@dataclass(slots=True)
+class Side:
+    active: Pokemon = None
+    bench: list = field(default_factory=list)
+    prizes: int = 4
+    discard: list = field(default_factory=list)
+
+    def render(self) -> str:
+        active = self.active.render() if self.active else "none"
+        bench = "; ".join(p.render() for p in self.bench) or "none"
+        return f"prizes {self.prizes} | Active: {active} | Bench: {bench}"
+
+
+@dataclass(slots=True)
+class Board:
+    """
+    Public game state kept by the engine. The model reports actions
+    (see ACTION_HELP); apply() updates the board, including Knock Outs
+    and prize cards, and render() produces the canonical text used in prompts.
+    """
+
+    sides: dict
+    max_bench: int = 5
+
+    @classmethod
+    def for_players(cls, names: list, prizes: int = 4) -> "Board":
+        return cls({name: Side(prizes=prizes) for name in names})
+
+    def opponent_of(self, name: str) -> str:
+        return next(n for n in self.sides if n != name)
+
+    def render(self) -> str:
+        return "\n".join(f"{name}: {side.render()}" for name, side in self.sides.items())
+
+    def winner(self):
+        """Name of the player who has taken all their prizes, if any."""
+        return next((name for name, side in self.sides.items() if side.prizes <= 0), None)
+
+    def _target(self, side: Side, target) -> Pokemon:
+        target = str(target or "active").lower()
+        if target == "active":
+            if side.active is None:
+                raise BoardError("there is no Active Pokémon")
+            return side.active
+        if target.startswith("bench"):
+            index = int(target.split(":")[1]) if ":" in target else 0
+            if not 0 <= index < len(side.bench):
+                raise BoardError(f"there is no Benched Pokémon {index}")
+            return side.bench[index]
+        for p in [side.active] + side.bench:
+            if p and p.name.lower() == target:
+                return p
+        raise BoardError(f"no Pokémon {target!r} in play")
+
+    def _knock_out(self, owner: str):
+        # move Knocked Out Pokémon to the discard and award prizes to the other player
+        side = self.sides[owner]
+        taker = self.sides[self.opponent_of(owner)]
+        for p in [side.active] + list(side.bench):
+            if p and p.knocked_out:
+                taker.prizes = max(taker.prizes - p.prize_value, 0)
+                side.discard.append(p.name)
+                if p is side.active:
+                    side.active = None
+                else:
+                    side.bench.remove(p)
+
+    def apply(self, player: str, action: dict):
+        """Apply one action reported by `player`; raises BoardError if it doesn't fit the board."""
+        if not isinstance(action, dict):
+            raise BoardError(f"action must be an object, got {action!r}")
+        kind = action.get("type")
+        me = self.sides[player]
+        opponent = self.opponent_of(player)
+        side_name = opponent if action.get("side") == "opponent" else player
+        try:
+            if kind == "play":
+                pokemon = Pokemon(action["card"], int(action["hp"]))
+                if action.get("to", "bench") == "active" and me.active is None:
+                    me.active = pokemon
+                elif len(me.bench) < self.max_bench:
+                    me.bench.append(pokemon)
+                else:
+                    raise BoardError("the Bench is full")
+            elif kind == "evolve":
+                base = self._target(me, action.get("target"))
+                base.name, base.hp = action["card"], int(action["hp"])
+                base.conditions.clear()
+            elif kind == "attach":
+                energy = str(action["energy"]).replace(" Energy", "")
+                self._target(me, action.get("target")).energies.append(energy)
+            elif kind == "retreat":
+                if me.active is None:
+                    raise BoardError("there is no Active Pokémon to retreat")
+                index = int(action.get("bench", 0))
+                incoming = self._target(me, f"bench:{index}")
+                del me.active.energies[:int(action.get("discard_energy", 0))]
+                me.active.conditions.clear()
+                me.bench[index] = me.active
+                me.active = incoming
+            elif kind == "attack":
+                defender = self.sides[opponent].active
+                if defender is None:
+                    raise BoardError("the opponent has no Active Pokémon")
+                defender.damage += int(action.get("damage", 0))
+                self._knock_out(opponent)
+            elif kind == "damage":
+                self._target(self.sides[side_name], action.get("target")).damage += int(action["amount"])
+                self._knock_out(side_name)
+            elif kind == "heal":
+                pokemon = self._target(me, action.get("target"))
+                pokemon.damage = max(pokemon.damage - int(action["amount"]), 0)
+            elif kind == "condition":
+                pokemon = self._target(self.sides[side_name], action.get("target"))
+                condition = action["condition"]
+                if condition == "none":
+                    pokemon.conditions.clear()
+                elif condition not in pokemon.conditions:
+                    pokemon.conditions.append(condition)
+            elif kind == "discard_energy":
+                pokemon = self._target(me, action.get("target"))
+                del pokemon.energies[:int(action.get("count", 1))]
+            elif kind == "promote":
+                if me.active is not None:
+                    raise BoardError("the Active spot is not empty")
+                index = int(action.get("bench", 0))
+                me.active = self._target(me, f"bench:{index}")
+                del me.bench[index]
+            else:
+                raise BoardError(f"unknown action type {kind!r}")
+        except (KeyError, TypeError) as e:
+            raise BoardError(f"{kind} action is missing or has a bad field: {e}")
+
+    def apply_all(self, player: str, actions) -> list:
+        """Apply each action in order; returns an error message per rejected action."""
+        errors = []
+        for action in actions or []:
+            try:
+                self.apply(player, action)
+            except (BoardError, ValueError) as e:
+                errors.append(f"Could not apply {action!r}: {e}")
+        return errors
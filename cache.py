@@ -0,0 +1,141 @@
+# cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+
+MODES = ("off", "record", "replay")
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of validated model replies.
+
+    Entries are keyed by a SHA-256 of (model, messages, temperature) and
+    stored one JSON file per key under `path`. The total size is capped at
+    `max_bytes`; the least recently used entries are evicted first.
+
+    mode "record": serve hits, call the model on misses and store the reply.
+    mode "replay": serve hits only; a miss raises CacheMiss, so a replayed
+                   game never reaches the API and is fully deterministic.
+    """
+
+    def __init__(self, path: str = "cache", mode: str = "record",
+                 max_bytes: int = 256 * 1024 * 1024, hot_entries: int = 1024):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cache mode {mode!r}; expected 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.hot_entries = hot_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+
+        # key -> file size, oldest first; rebuilt from file mtimes at startup
+        self.index = OrderedDict()
+        self.total_bytes = 0
+        entries = []
+        for name in os.listdir(path):
+            if name.endswith(".json"):
+                st = os.stat(os.path.join(path, name))
+                entries.append((st.st_mtime, name[:-5], st.st_size))
+        for _, key, size in sorted(entries):
+            self.index[key] = size
+            self.total_bytes += size
+
+        # in-process copies of recently used replies, so repeat hits skip the disk
+        self.hot = OrderedDict()
+
+    @staticmethod
+    def key(model: str, messages: list, temperature) -> str:
+        blob = json.dumps([model, messages, temperature], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def _remember(self, key: str, raw: str):
+        self.hot[key] = raw
+        self.hot.move_to_end(key)
+        while len(self.hot) > self.hot_entries:
+            self.hot.popitem(last=False)
+
+    def get(self, key: str):
+        """Return the cached raw reply for `key`, or None (CacheMiss in replay mode)."""
+        raw = self.hot.get(key)
+        if raw is None and key in self.index:
+            try:
+                with open(self._file(key), encoding="utf-8") as f:
+                    raw = json.load(f)["raw"]
+            except (OSError, ValueError, KeyError):
+                self._drop(key)
+                raw = None
+        if raw is None:
+            self.misses += 1
+            if self.mode == "replay":
+                raise CacheMiss(f"No recorded response for prompt {key[:12]}")
+            return None
+
+        self.hits += 1
+        self.index.move_to_end(key)
+        self._remember(key, raw)
+        try:
+            os.utime(self._file(key))
+        except OSError:
+            pass
+        return raw
+
+    def put(self, key: str, raw: str, model: str = None):
+        """Store a validated raw reply under `key`, evicting LRU entries past max_bytes."""
+        if self.mode == "replay":
+            return
+        blob = json.dumps({"model": model, "created": time.time(), "raw": raw}, ensure_ascii=False)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(blob)
+        os.replace(tmp, self._file(key))
+
+        self.total_bytes -= self.index.pop(key, 0)
+        self.index[key] = len(blob.encode("utf-8"))
+        self.total_bytes += self.index[key]
+        self._remember(key, raw)
+        while self.total_bytes > self.max_bytes and len(self.index) > 1:
+            oldest = next(iter(self.index))
+            self._drop(oldest)
+
+    def _drop(self, key: str):
+        self.total_bytes -= self.index.pop(key, 0)
+        self.hot.pop(key, None)
+        try:
+            os.remove(self._file(key))
+        except OSError:
+            pass
+
+
+def cache_lookup(cache, model: str, temperature, messages: list):
+    """Return (key, cached raw reply or None) for a request; (None, None) when `cache` is None."""
+    if cache is None:
+        return None, None
+    key = cache.key(model, messages, temperature)
+    return key, cache.get(key)
+
+
+def cache_store(cache, key, raw: str, model: str = None):
+    """Record a validated reply fetched after a cache_lookup miss."""
+    if cache is not None and key is not None:
+        cache.put(key, raw, model)
+
+
+def make_cache(mode: str = "off", path: str = "cache", max_mb: int = 256):
+    """Build the cache for a --cache-mode flag; "off" returns None."""
+    if mode == "off":
+        return None
+    return ResponseCache(path, mode, max_mb * 1024 * 1024)
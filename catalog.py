@@ -0,0 +1,150 @@
+# catalog.py
+
+import json
+import os
+import pickle
+import re
+import tempfile
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+# card data shipped with the repo, and its compiled form (rebuilt when the data changes)
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cards.json")
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "cards.pickle")
+CACHE_VERSION = 2
+
+# "4 Blitzle VIV 53" -> count=4, name="Blitzle"; "18 Lightning Energy 155" -> name="Lightning Energy"
+CARD_LINE = re.compile(r"^(\d+)\s+(.*?)(?:\s+[A-Z]{2,4})?\s+\d+$")
+
+
+@dataclass(slots=True, frozen=True)
+class Card:
+    id: str                   # "<set>-<number>", e.g. "FST-91"
+    name: str
+    category: str             # Pokemon, Trainer or Energy
+    stage: str = None         # Basic / Stage 1 / Stage 2; Item / Supporter for Trainers
+    type: str = None
+    hp: int = 0
+    evolves_from: str = None
+
+    @property
+    def set_code(self) -> str:
+        return self.id.rsplit("-", 1)[0]
+
+    @property
+    def is_basic_pokemon(self) -> bool:
+        return self.category == "Pokemon" and self.stage == "Basic"
+
+
+class Catalog:
+    """
+    Card data indexed by id, name and (set, number). Names are matched
+    case-insensitively.
+    """
+
+    def __init__(self, cards: list):
+        self.by_id = {}
+        self.by_name = defaultdict(list)
+        self.by_set_number = {}
+        for card in cards:
+            self.by_id[card.id] = card
+            self.by_name[card.name.lower()].append(card)
+            set_code, number = card.id.rsplit("-", 1)
+            self.by_set_number[(set_code, number)] = card
+        # a plain dict pickles and looks up faster than a defaultdict that grows on misses
+        self.by_name = dict(self.by_name)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def find(self, name: str, set_code: str = None, number: str = None) -> Card:
+        """The card printed as `set_code` `number`, else the first card called `name`; None if unknown."""
+        if set_code and number:
+            card = self.by_set_number.get((set_code, str(number)))
+            if card:
+                return card
+        cards = self.by_name.get(name.lower())
+        return cards[0] if cards else None
+
+    def is_basic(self, name: str) -> bool:
+        card = self.find(name)
+        return bool(card and card.is_basic_pokemon)
+
+    def evolves_from(self, name: str) -> str:
+        card = self.find(name)
+        return card.evolves_from if card else None
+
+    def parse_deck(self, deck: str) -> Counter:
+        """
+        Card id -> copies for a config.DECKS decklist. Lines are matched by set
+        code and number, falling back to the name; raises KeyError naming every
+        card the catalog doesn't have.
+        """
+        counts, missing = Counter(), []
+        for line in deck.strip().splitlines():
+            line = line.strip()
+            m = CARD_LINE.match(line)
+            if not m:
+                continue
+            parts = line.split()
+            number = parts[-1]
+            set_code = parts[-2] if len(parts) > 2 and parts[-2].isupper() and parts[-2].isalpha() else None
+            card = self.find(m.group(2), set_code, number)
+            if card is None:
+                missing.append(m.group(2))
+            else:
+                counts[card.id] += int(m.group(1))
+        if missing:
+            raise KeyError(f"cards not in the catalog: {', '.join(missing)}")
+        return counts
+
+    def names(self, counts: Counter) -> Counter:
+        """Card name -> copies for parse_deck() output."""
+        out = Counter()
+        for card_id, copies in counts.items():
+            out[self.by_id[card_id].name] += copies
+        return out
+
+
+def read_cards(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [Card(**entry) for entry in json.load(f)]
+
+
+def build(path: str = DATA_PATH, cache_path: str = CACHE_PATH) -> Catalog:
+    """
+    Load the catalog from its compiled cache if that is current, else parse
+    `path`, index it and write the cache atomically.
+    """
+    st = os.stat(path)
+    stamp = (CACHE_VERSION, st.st_mtime_ns, st.st_size)
+    try:
+        with open(cache_path, "rb") as f:
+            cached_stamp, catalog = pickle.load(f)
+        if cached_stamp == stamp:
+            return catalog
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError):
+        pass
+
+    catalog = Catalog(read_cards(path))
+    directory = os.path.dirname(cache_path) or "."
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((stamp, catalog), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass                    # a read-only checkout still works, just without the cache
+    return catalog
+
+
+_catalog = None
+
+
+def load_catalog() -> Catalog:
+    """The process-wide catalog, built on first use."""
+    global _catalog
+    if _catalog is None:
+        _catalog = build()
+    return _catalog
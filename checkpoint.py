@@ -0,0 +1,92 @@
+# checkpoint.py
+
+import os
+import pickle
+import tempfile
+
+SNAPSHOT_VERSION = 2
+# per-run objects that are re-attached on resume instead of being saved; derived
+# lookups (the rules checker's catalog and card pattern) rebuild themselves on load
+TRANSIENT = ("cache", "last_calls")
+
+
+def atomic_write(path: str, data: bytes):
+    """
+    Write `data` to `path` so readers see either the old file or the new one,
+    never half of it, even after a crash or power loss: the data is flushed
+    to disk before the rename, and the rename before returning.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return                  # directories can't be opened on Windows; the rename is still atomic
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class Checkpoint:
+    """
+    Snapshot file for one game: the players (memory, board_state, history,
+    notebook, pending draw/notes ...), the driver (its shuffled piles and
+    rng) and the loop counters, rewritten atomically after every completed
+    action. Objects shared between players, like a typed board.Board or an
+    events.PublicLog, stay shared after a restore. A finished game is saved
+    with its result, so resuming it returns at once.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.saves = 0
+
+    def save(self, players, driver, loop: dict, result: dict = None):
+        state = {
+            "version": SNAPSHOT_VERSION,
+            "players": [(type(p), {k: v for k, v in vars(p).items() if k not in TRANSIENT})
+                        for p in players],
+            "driver": driver,
+            "loop": loop,
+            "result": result,
+        }
+        atomic_write(self.path, pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+        self.saves += 1
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self, player_cls=None, cache=None) -> dict:
+        """
+        The saved snapshot with "players" rebuilt as objects (sharing `cache`).
+        Raises ValueError if it is from another version or player class.
+        """
+        with open(self.path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{self.path}: snapshot version {state.get('version')}, expected {SNAPSHOT_VERSION}")
+        players = []
+        for cls, fields in state["players"]:
+            if player_cls is not None and cls is not player_cls:
+                raise ValueError(f"{self.path} was saved by {cls.__module__}.{cls.__name__}, "
+                                 f"not {player_cls.__module__}.{player_cls.__name__}")
+            p = cls.__new__(cls)
+            p.__dict__.update(fields)
+            p.cache = cache
+            p.last_calls = []
+            players.append(p)
+        state["players"] = players
+        return state
@@ -0,0 +1,40 @@
+# client.py
+
+import openai
+import httpx
+
+# One pooled AsyncOpenAI client per process, shared by every game on the event loop.
+_async_client = None
+
+
+def get_async_client(api_key: str = None, max_connections: int = 100,
+                     base_url: str = None) -> openai.AsyncOpenAI:
+    """
+    Return the process-wide AsyncOpenAI client, creating it on first use.
+    The underlying httpx client keeps up to `max_connections` pooled
+    keep-alive connections so concurrent games reuse TLS sessions.
+    `base_url` points it at another OpenAI-compatible server.
+    """
+    global _async_client
+    if _async_client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=httpx.Timeout(120.0, connect=10.0),
+        )
+        _async_client = openai.AsyncOpenAI(
+            api_key=api_key or openai.api_key,
+            base_url=base_url,
+            http_client=http_client,
+        )
+    return _async_client
+
+
+async def close_async_client():
+    """Close the shared client and its connection pool."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
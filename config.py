@@ -9,6 +9,9 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("Please set the OPENAI_API_KEY environment variable")
 
+# Optional OpenAI-compatible endpoint, e.g. the local mockllm.py server
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
 DECKS = {
     "Player1": """
 Pokemon - 22
@@ -0,0 +1,77 @@
+# deck.py
+
+import random
+from collections import Counter
+from catalog import load_catalog
+
+
+def parse_counts(deck: str) -> Counter:
+    """
+    Card name -> copies in a config.DECKS decklist, resolved through the card
+    catalog (catalog.Catalog.parse_deck), so every card is named as in the
+    catalog. Raises KeyError for cards the catalog doesn't have.
+    """
+    catalog = load_catalog()
+    return catalog.names(catalog.parse_deck(deck))
+
+
+def parse_decklist(deck: str) -> list:
+    """Expand a config.DECKS decklist into a flat list of card names, one entry per physical card."""
+    return list(parse_counts(deck).elements())
+
+
+class Deck:
+    """
+    One player's shuffled deck. `rng` is a random.Random (or a seed), so
+    games dealt from the same seed are identical. The top of the deck is
+    the end of `pile`.
+    """
+
+    def __init__(self, cards: list, rng=None):
+        self.rng = rng if isinstance(rng, random.Random) else random.Random(rng)
+        self.cards = list(cards)
+        self.pile = list(cards)
+        self.rng.shuffle(self.pile)
+        self.prizes = []
+
+    @classmethod
+    def from_decklist(cls, deck: str, rng=None) -> "Deck":
+        return cls(parse_decklist(deck), rng)
+
+    @property
+    def counts(self) -> Counter:
+        return Counter(self.cards)
+
+    def __len__(self) -> int:
+        return len(self.pile)
+
+    def draw(self):
+        """The top card, or None if the deck is empty."""
+        return self.pile.pop() if self.pile else None
+
+    def remove(self, cards: list, key=str.lower) -> list:
+        """Take `cards` dealt by other means out of the pile (matched by `key`); returns those not in it."""
+        missing = []
+        for card in cards:
+            index = next((i for i, c in enumerate(self.pile) if key(c) == key(card)), None)
+            if index is None:
+                missing.append(card)
+            else:
+                del self.pile[index]
+        return missing
+
+    def deal(self, hand_size: int = 7, prizes: int = 4, basics=None):
+        """
+        Draw an opening hand and set aside prize cards; returns (hand, mulligans).
+        With a set of `basics`, hands without one are shuffled back and redrawn.
+        """
+        mulligans = 0
+        while True:
+            hand = [self.pile.pop() for _ in range(hand_size)]
+            if not basics or any(card in basics for card in hand):
+                break
+            mulligans += 1
+            self.pile.extend(hand)
+            self.rng.shuffle(self.pile)
+        self.prizes = [self.pile.pop() for _ in range(prizes)]
+        return hand, mulligans
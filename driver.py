@@ -0,0 +1,173 @@
+# driver.py
+
+import json
+import random
+import re
+from deck import Deck
+from catalog import load_catalog
+from notebook import HAND
+from rules import canonical
+
+def prizes_left(board, name: str):
+    """
+    Best-effort read of `name`'s remaining prize cards from the AI-reported
+    public_info, which is either a dict keyed by player or free text,
+    or exactly from a typed board.Board. Returns None when the count can't be found.
+    """
+    if hasattr(board, "sides"):
+        side = board.sides.get(name)
+        return side.prizes if side else None
+    if isinstance(board, dict):
+        section = board.get(name)
+        if isinstance(section, dict):
+            for key, value in section.items():
+                if "prize" in key.lower():
+                    m = re.search(r"\d+", str(value))
+                    return int(m.group()) if m else None
+        return None
+    m = re.search(rf"{re.escape(name)}\b.*?prize[^0-9.;]*(\d+)", str(board), re.I | re.S)
+    return int(m.group(1)) if m else None
+
+
+def default_policy(player, request) -> str:
+    """Answer an AI user_input_request without a human in the loop."""
+    return "No further information is available; decide on your own and continue."
+
+
+def end_reason(driver) -> str:
+    """
+    Why an "end" answer stopped the game, for the console and the result:
+    the driver's own reason (set when it ends a game itself), else the operator.
+    """
+    return getattr(driver, "ended", None) or "by user"
+
+
+class InteractiveDriver:
+    """
+    Asks the operator for every game input on the command line,
+    exactly like the original main loop did.
+    Every method returns the raw answer; "end" stops the game.
+    With `decks`, draws come from a seeded shuffle instead (see deal()).
+    """
+
+    NOTE_PROMPT = "\nPress Enter to continue, or type a note to include in AI prompt> "
+    CONFIRM_PROMPT = "\nAI wants to end its turn. Confirm end turn? (yes/no)> "
+
+    def __init__(self, decks: dict = None, seed=None):
+        rng = random.Random(seed)
+        self.piles = {name: Deck.from_decklist(deck, rng) for name, deck in (decks or {}).items()}
+        self.ended = None             # why the driver ended the game (see end_reason)
+
+    def deal(self, name: str, hand_size: int = 7, prizes: int = 4) -> str:
+        return deal_setup(self.piles[name], hand_size, prizes)
+
+    def draw(self, player) -> str:
+        pile = self.piles.get(player.name)
+        if pile is not None:
+            card = pile.draw()
+            print(f"{player.name} draws: {card or 'nothing, the deck is empty'}")
+            if card is None:
+                self.ended = f"because {player.name} decked out"
+            return card or "end"
+        return input("Draw a card (enter card name)> ").strip()
+
+    def peek(self, player):
+        """The card `player` will draw next, if it comes from a dealt deck; else None."""
+        pile = self.piles.get(player.name)
+        return pile.pile[-1] if pile else None
+
+    def public_info(self, player) -> str:
+        return input("Enter updated public info as JSON> ").strip()
+
+    def answer_request(self, player, request) -> str:
+        return input("Your response> ").strip()
+
+    def note(self, player) -> str:
+        return input(self.NOTE_PROMPT).strip()
+
+    def confirm_end_turn(self, player) -> str:
+        return input(self.CONFIRM_PROMPT).strip().lower()
+
+
+class NoMemInteractiveDriver(InteractiveDriver):
+    """InteractiveDriver with the prompts of the original main_no_mem loop."""
+
+    NOTE_PROMPT = "\nPress Enter to continue, or type a note> "
+    CONFIRM_PROMPT = "\nAI wants to end turn. Confirm? (yes/no)> "
+
+
+def deal_setup(pile: Deck, hand_size: int = 7, prizes: int = 4) -> str:
+    """
+    Deal an opening hand and set aside prize cards from `pile`, redealing
+    hands without a Basic Pokémon (per the card catalog).
+    Returns an initial-setup string in the config.INITIAL_SETUPS style.
+    """
+    catalog = load_catalog()
+    basics = {card for card in pile.cards if catalog.is_basic(card)}
+    hand, _ = pile.deal(hand_size, prizes, basics)
+    return f"You have {prizes} prize cards. Your hand is: {', '.join(hand)}."
+
+
+def set_aside(driver, setups: dict):
+    """
+    Take the opening hands of fixed `setups` (config.INITIAL_SETUPS) out of
+    the driver's draw piles, so those cards can't be drawn a second time.
+    """
+    for name, pile in getattr(driver, "piles", {}).items():
+        m = HAND.search(setups.get(name) or "")
+        if m:
+            pile.remove([c.strip() for c in m.group(1).split(",") if c.strip()], key=canonical)
+
+
+class AutoDriver:
+    """
+    Runs a game unattended: draws come from a seeded shuffle of each
+    player's decklist, end_turn is always confirmed, no notes are added,
+    and user_input_request is answered by `policy(player, request)`.
+    The game ends when a player has to draw from an empty deck,
+    when the public board shows a player with no prizes left,
+    or after `max_turns` draws.
+    """
+
+    def __init__(self, decks: dict, seed=None, policy=None, max_turns=None):
+        self.rng = random.Random(seed)
+        self.policy = policy or default_policy
+        self.max_turns = max_turns
+        self.turns = 0
+        self.decked_out = None
+        self.ended = None             # why the driver ended the game (see end_reason)
+        self.piles = {name: Deck.from_decklist(deck, self.rng) for name, deck in decks.items()}
+
+    def deal(self, name: str, hand_size: int = 7, prizes: int = 4) -> str:
+        return deal_setup(self.piles[name], hand_size, prizes)
+
+    def draw(self, player) -> str:
+        self.turns += 1
+        if self.max_turns is not None and self.turns > self.max_turns:
+            self.ended = f"at the turn limit ({self.max_turns})"
+            return "end"
+        board = getattr(player, "board", None) or player.board_state
+        out = [name for name in self.piles if prizes_left(board, name) == 0]
+        if out:
+            self.ended = f"because {out[0]} took every prize card"
+            return "end"
+        pile = self.piles.get(player.name)
+        card = pile.draw() if pile is not None else None
+        if card is None:
+            self.decked_out = player.name
+            self.ended = f"because {player.name} decked out"
+            return "end"
+        return card
+
+    def public_info(self, player) -> str:
+        # hand back whatever the AI last reported, unchanged
+        return json.dumps(player.board_state)
+
+    def answer_request(self, player, request) -> str:
+        return self.policy(player, request)
+
+    def note(self, player) -> str:
+        return ""
+
+    def confirm_end_turn(self, player) -> str:
+        return "yes"
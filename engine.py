@@ -0,0 +1,219 @@
+# engine.py
+
+import openai
+import asyncio
+import argparse
+import os
+import time
+from config import OPENAI_API_KEY, OPENAI_BASE_URL, DECKS, ORDER, LOG_DIR, INITIAL_SETUPS
+from logger import Logger
+from driver import AutoDriver, prizes_left, set_aside
+from client import get_async_client, close_async_client
+from cache import make_cache
+from metrics import add_metrics_args, make_metrics
+from board import Board
+from checkpoint import Checkpoint
+from events import PublicLog
+from ratelimit import add_rate_limit_args, make_limiter, limit_client
+from backends import load_router, route_client
+import main as memory_variant
+import main_no_mem as no_memory_variant
+import player
+import player_no_mem
+
+# variant name -> (play_game coroutine, Player class)
+VARIANTS = {
+    "memory": (memory_variant.play_game, player.Player),
+    "no_mem": (no_memory_variant.play_game, player_no_mem.Player),
+}
+
+
+def config_specs(n_games: int, seed: int = 0) -> list:
+    """Game specs for `n_games` replays of the config.DECKS match, seeds seed..seed+n-1."""
+    return [
+        {"game_id": f"game{i}", "decks": DECKS, "setups": INITIAL_SETUPS, "seed": seed + i}
+        for i in range(n_games)
+    ]
+
+
+def decide_winner(players, driver):
+    """
+    Winner of a finished AutoDriver game, or None for a draw.
+    Decking out loses; otherwise the player with fewer prizes left on the
+    last reported board wins (this also adjudicates games cut off by max_turns).
+    """
+    names = [p.name for p in players]
+    if driver.decked_out:
+        return next(n for n in names if n != driver.decked_out)
+    board = getattr(players[0], "board", None) or players[0].board_state
+    left = {n: prizes_left(board, n) for n in names}
+    if None in left.values() or len(set(left.values())) == 1:
+        return None
+    return min(left, key=left.get)
+
+
+async def run_games(specs: list, concurrency: int = 10, max_turns: int = None,
+                    variant: str = "memory", *, quiet: bool = True, cache=None,
+                    log_prefix: str = "", log_dir: str = LOG_DIR,
+                    base_url: str = OPENAI_BASE_URL, metrics=None,
+                    typed_board: bool = False, memory_ops: bool = False,
+                    stream: bool = False, schema: bool = False, rules: bool = False,
+                    checkpoint_dir: str = None, resume: bool = False, resume_failed: int = 2,
+                    client=None, limiter=None, best_of: int = 1, router=None,
+                    snapshot_every: int = 0, on_finish=None) -> list:
+    """
+    Play every game spec unattended, interleaved on the current event loop.
+    A spec is a dict with "game_id", "decks" ({"Player1": ..., "Player2": ...}),
+    "seed" and optionally "setups"; without setups, opening hands and prizes
+    are dealt from the seeded deck. At most `concurrency` games are in flight
+    at once and all of them share one pooled AsyncOpenAI client
+    (and `cache`, an optional cache.ResponseCache, and `metrics`, an
+    optional metrics.Metrics aggregating every game). Log files are named
+    <log_prefix><player>.jsonl in `log_dir`; records carry the game id.
+    `typed_board` gives each game an engine-kept board.Board and `memory_ops`
+    switches players to incremental memory edits (memory variant only);
+    `stream` streams replies and cuts invalid ones short; `schema` asks for
+    schema-constrained replies; `rules` checks decisions locally (memory variant).
+    With `checkpoint_dir`, each game is snapshotted to <log_prefix><game_id>.ckpt
+    there after every action; a game that fails (e.g. on an API error) is
+    resumed from its last snapshot up to `resume_failed` times, and `resume`
+    continues from the snapshots of an earlier run (finished games are not replayed).
+    `client` replaces the pooled AsyncOpenAI client (e.g. a batch.BatchClient);
+    the caller closes it. `limiter`, a ratelimit.RateLimiter, keeps every
+    game's requests within the API key's request and token rate limits.
+    `best_of` > 1 samples that many candidate replies per action and keeps
+    the one scorer.py ranks highest (memory variant). `router`, a
+    backends.Router, sends each request to a backend chosen per player and
+    phase; the pooled client serves the backends without their own URL.
+    `snapshot_every` > 0 gives each game an events.PublicLog, so prompts carry
+    board changes with a full snapshot every that many actions (memory variant).
+    `on_finish` is called with each game's id once it is done, whether it
+    finished or failed (e.g. batch.BatchClient.finish, so lockstep steps stop
+    waiting for it).
+    """
+    play_game, player_cls = VARIANTS[variant]
+    logger = Logger(log_dir, log_prefix)
+    own_client = client is None
+    if own_client:
+        client = get_async_client(OPENAI_API_KEY, max_connections=concurrency, base_url=base_url)
+    client = route_client(limit_client(client, limiter), router)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(spec):
+        try:
+            return await play(spec)
+        finally:
+            if on_finish is not None:
+                on_finish(spec["game_id"])
+
+    async def play(spec):
+        async with limit:
+            checkpoint = None
+            if checkpoint_dir:
+                checkpoint = Checkpoint(os.path.join(checkpoint_dir, f"{log_prefix}{spec['game_id']}.ckpt"))
+            loop = None
+            if resume and checkpoint is not None and checkpoint.exists():
+                state = checkpoint.load(player_cls, cache)
+                players, driver, loop = state["players"], state["driver"], state["loop"]
+                if state["result"] is not None:
+                    return dict(state["result"], winner=decide_winner(players, driver))
+            else:
+                driver = AutoDriver(spec["decks"], spec["seed"], max_turns=max_turns)
+                setups = spec.get("setups")
+                if setups:
+                    set_aside(driver, setups)
+                else:
+                    setups = {name: driver.deal(name) for name in spec["decks"]}
+                board = Board.for_players(list(spec["decks"])) if typed_board else None
+                log = PublicLog(snapshot_every) if snapshot_every > 0 else None
+                players = memory_variant.make_players(
+                    player_cls, spec["decks"], ORDER, setups, cache=cache, board=board, memory_ops=memory_ops,
+                    stream=stream, schema=schema, rules=rules, best_of=best_of, public_log=log)
+            for attempt in range(resume_failed + 1):
+                result = await play_game(players, driver, logger, client, game_id=spec["game_id"],
+                                         quiet=quiet, metrics=metrics, checkpoint=checkpoint, loop=loop)
+                if not result["error"] or checkpoint is None or attempt == resume_failed:
+                    break
+                # pick up from the last completed action instead of replaying the game
+                await asyncio.sleep(2 ** attempt)
+                state = checkpoint.load(player_cls, cache)
+                players, driver, loop = state["players"], state["driver"], state["loop"]
+            result["resumed"] = attempt
+            result["winner"] = None if result["error"] else decide_winner(players, driver)
+            return result
+
+    try:
+        return await asyncio.gather(*(one(spec) for spec in specs))
+    finally:
+        if router is not None:
+            await router.close()
+        if own_client:
+            await close_async_client()
+        logger.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many unattended PTCG AI games concurrently")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-turns", type=int, default=20)
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default="memory")
+    parser.add_argument("--stream", action="store_true", help="stream replies, cutting invalid ones short")
+    parser.add_argument("--schema", action="store_true", help="schema-constrained replies (falls back if unsupported)")
+    parser.add_argument("--typed-board", action="store_true", help="engine-kept board (memory variant)")
+    parser.add_argument("--rules", action="store_true", help="local legality checks (memory variant)")
+    parser.add_argument("--memory-ops", action="store_true", help="incremental memory edits (memory variant)")
+    parser.add_argument("--best-of", type=int, default=1,
+                        help="candidate replies per action, best one kept by the local scorer (memory variant)")
+    parser.add_argument("--public-log", type=int, default=0, metavar="SNAPSHOT_EVERY",
+                        help="board changes instead of the full board in prompts, with a snapshot "
+                             "every N actions (memory variant)")
+    parser.add_argument("--checkpoint-dir", default=None, help="snapshot every game here after each action")
+    parser.add_argument("--resume", action="store_true", help="continue the games saved in --checkpoint-dir")
+    parser.add_argument("--resume-failed", type=int, default=2,
+                        help="times a failed game is resumed from its last snapshot")
+    memory_variant.add_cache_args(parser)
+    add_rate_limit_args(parser)
+    parser.add_argument("--backends", default=None, help="JSON file of model backends and routes (see backends.py)")
+    add_metrics_args(parser)
+    args = parser.parse_args()
+    if (args.typed_board or args.memory_ops or args.rules or args.best_of > 1
+         or args.public_log) and args.variant != "memory":
+        parser.error("--typed-board, --memory-ops, --rules, --best-of and --public-log need --variant memory")
+    if args.resume and not args.checkpoint_dir:
+        parser.error("--resume needs --checkpoint-dir")
+
+    openai.api_key = OPENAI_API_KEY
+    started = time.monotonic()
+    specs = config_specs(args.games, args.seed)
+    cache = make_cache(args.cache_mode, args.cache_dir, args.cache_mb)
+    metrics = make_metrics(args)
+    limiter = make_limiter(args)
+    router = load_router(args.backends)
+    results = asyncio.run(run_games(specs, args.concurrency, args.max_turns, args.variant,
+                                    cache=cache, metrics=metrics, typed_board=args.typed_board,
+                                    memory_ops=args.memory_ops, stream=args.stream, schema=args.schema,
+                                    rules=args.rules, checkpoint_dir=args.checkpoint_dir,
+                                    resume=args.resume, resume_failed=args.resume_failed, limiter=limiter,
+                                    best_of=args.best_of, router=router, snapshot_every=args.public_log))
+    elapsed = time.monotonic() - started
+
+    for r in results:
+        status = f"ERROR: {r['error']}" if r["error"] else f"winner: {r['winner'] or 'draw'}"
+        if r.get("resumed"):
+            status += f", resumed {r['resumed']}x"
+        print(f"{r['game_id']}: {r['turns']} turns in {r['seconds']:.1f}s ({status})")
+    print(f"{len(results)} games in {elapsed:.1f}s = {len(results) * 3600 / elapsed:.1f} games/hour")
+    if cache:
+        print(f"cache: {cache.hits} hits, {cache.misses} misses")
+    if limiter:
+        print(limiter.summary())
+    if router:
+        print(router.summary())
+    if args.metrics_file:
+        print(f"metrics written to {args.metrics_file}")
+
+
+if __name__ == "__main__":
+    main()
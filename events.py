@@ -0,0 +1,103 @@
+# events.py
+
+import json
+
+
+def flatten(board, prefix: str = "") -> dict:
+    """
+    "path" -> value text for a public board: nested public_info dicts become
+    "Player1 / Active" style paths, a typed board.Board one line per side,
+    and free text a single entry.
+    """
+    if isinstance(board, str) and board.lstrip().startswith("{"):
+        try:
+            board = json.loads(board)      # public_info sent as a JSON string (schema replies)
+        except ValueError:
+            pass
+    if hasattr(board, "sides"):
+        return {name: side.render() for name, side in board.sides.items()}
+    if isinstance(board, dict):
+        out = {}
+        for key, value in board.items():
+            path = f"{prefix} / {key}" if prefix else str(key)
+            if isinstance(value, dict) and value:
+                out.update(flatten(value, path))
+            else:
+                out[path] = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+        return out
+    return {prefix or "public_info": str(board)} if board else {}
+
+
+def render(state: dict) -> str:
+    return "\n".join(f"{path}: {value}" for path, value in state.items())
+
+
+class PublicLog:
+    """
+    Shared, append-only, versioned log of public game events: board changes
+    (as per-path diffs of what a player reported, or of the typed board) and
+    each player's announced decisions. The version is the number of events.
+    Every player keeps the last version it has seen; view() gives it only what
+    happened since, and a full board snapshot on its first view and every
+    `snapshot_every` views after that, so both players work from one state.
+    """
+
+    def __init__(self, snapshot_every: int = 5):
+        self.snapshot_every = snapshot_every
+        self.events = []             # (version, player, kind, decisions text or {path: value})
+        self.state = {}              # flattened board after the latest event
+
+    @property
+    def version(self) -> int:
+        return len(self.events)
+
+    def _append(self, player: str, kind: str, payload) -> int:
+        self.events.append((self.version + 1, player, kind, payload))
+        return self.version
+
+    def record_action(self, player: str, decisions: str):
+        if decisions:
+            self._append(player, "action", decisions)
+
+    def record_board(self, player: str, board) -> bool:
+        """Log the changes `board` makes to the public state; False if there were none."""
+        new = flatten(board)
+        changes = {path: value for path, value in new.items() if self.state.get(path) != value}
+        changes.update((path, "(gone)") for path in self.state if path not in new)
+        self.state = new
+        if not changes:
+            return False
+        self._append(player, "board", changes)
+        return True
+
+    def snapshot(self) -> str:
+        return render(self.state)
+
+    def snapshot_due(self, player) -> bool:
+        return player.seen_version == 0 or player.views_since_snapshot >= self.snapshot_every
+
+    def view(self, player) -> tuple:
+        """
+        (board section, opponent actions) for `player`'s next prompt: the full
+        board when a snapshot is due, otherwise the latest value of each path
+        changed after player.seen_version. Leaves the player's position as it
+        is, so a rejected reply is asked again with the same view.
+        """
+        new = self.events[player.seen_version:]      # event v is at index v - 1
+        actions = "\n".join(f"{who}: {text}" for _, who, kind, text in new
+                            if kind == "action" and who != player.name)
+        if self.snapshot_due(player):
+            board = f"[Board state v{self.version}:\n{self.snapshot()}]" if self.state else ""
+        else:
+            changes = {}
+            for _, _, kind, payload in new:
+                if kind == "board":
+                    changes.update(payload)
+            board = (f"[Board changes v{player.seen_version}→v{self.version}:\n{render(changes)}]"
+                     if changes else f"[Board unchanged since v{player.seen_version}]")
+        return board, actions
+
+    def seen(self, player):
+        """Mark everything up to now as seen by `player`, once its action has been applied."""
+        player.views_since_snapshot = 0 if self.snapshot_due(player) else player.views_since_snapshot + 1
+        player.seen_version = self.version
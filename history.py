@@ -0,0 +1,84 @@
+# history.py
+
+import json
+from player import estimate_tokens
+
+# rough per-message overhead of the chat format, in tokens
+MESSAGE_TOKENS = 4
+
+
+def message_tokens(message: dict) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_TOKENS
+
+
+def digest(user: dict, assistant: dict, width: int = 160) -> str:
+    """One-line summary of an evicted turn: what was drawn/noted and what was decided."""
+    facts = [line.strip("[]") for line in user["content"].splitlines()
+             if line.startswith(("[Drawn card", "[User note", "[New Turn"))]
+    decided = ""
+    if assistant is not None:
+        try:
+            decided = json.loads(assistant["content"]).get("decisions", "")
+        except (json.JSONDecodeError, AttributeError):
+            decided = assistant["content"]
+        if not isinstance(decided, str):
+            decided = json.dumps(decided, ensure_ascii=False)
+    line = "; ".join(facts + ([f"did: {decided}"] if decided else []))
+    return line if len(line) <= width else line[:width - 1] + "…"
+
+
+class History:
+    """
+    Chat history with a token budget.
+
+    Keeps the system message, a rolling summary of evicted turns and the
+    most recent (user, assistant) pairs. When messages() would exceed
+    `budget` tokens, the oldest pairs are evicted whole and folded into the
+    summary as one line each; the summary keeps at most `summary_budget`
+    tokens of the latest lines. Evicted messages are dropped, so memory use
+    stays bounded however long the game runs.
+    """
+
+    def __init__(self, system: str, budget: int = 6000, summary_budget: int = 600):
+        self.system = {"role": "system", "content": system}
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.summary = []          # one line per evicted turn, oldest first
+        self.turns = []            # [user message, assistant message or None]
+
+    def add_user(self, content: str):
+        self.turns.append([{"role": "user", "content": content}, None])
+        self._trim()
+
+    def add_assistant(self, content: str):
+        if not self.turns or self.turns[-1][1] is not None:
+            self.turns.append([None, None])
+        self.turns[-1][1] = {"role": "assistant", "content": content}
+        self._trim()
+
+    def _summary_message(self):
+        if not self.summary:
+            return None
+        return {"role": "user", "content": "[Earlier in this game]\n" + "\n".join(self.summary)}
+
+    def messages(self) -> list:
+        """The messages to send: system, summary, then the kept turns in order."""
+        out = [self.system]
+        summary = self._summary_message()
+        if summary:
+            out.append(summary)
+        for user, assistant in self.turns:
+            out.extend(m for m in (user, assistant) if m is not None)
+        return out
+
+    def tokens(self) -> int:
+        return sum(message_tokens(m) for m in self.messages())
+
+    def _trim(self):
+        # always keep the newest turn, even if it alone is over budget
+        while len(self.turns) > 1 and self.tokens() > self.budget:
+            user, assistant = self.turns.pop(0)
+            if user is not None:
+                self.summary.append(digest(user, assistant))
+            while self.summary and sum(estimate_tokens(s) for s in self.summary) > self.summary_budget:
+                self.summary.pop(0)
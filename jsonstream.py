@@ -0,0 +1,179 @@
+# jsonstream.py
+
+import json
+import time
+
+
+class StreamError(ValueError):
+    """The streamed text can no longer become a valid reply."""
+
+
+class StreamParser:
+    """
+    Incremental parser for one top-level JSON object arriving in chunks,
+    optionally wrapped in ```json fences.
+
+    feed() returns the top-level fields completed by each chunk as
+    (key, value) pairs and raises StreamError as soon as the text can't
+    become a JSON object with every key in `required`; finish() does the
+    final check when the stream ends. Nested values are only decoded once
+    they are complete.
+    """
+
+    def __init__(self, required=()):
+        self.required = tuple(required)
+        self.text = ""
+        self.fields = {}
+        self.pos = 0
+        self.state = "start"      # start, key, colon, value, string, nested, scalar, after, done
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.key = None
+        self.start = 0            # where the current key or value began
+
+    def feed(self, chunk: str) -> list:
+        self.text += chunk
+        done = []
+        text = self.text
+        while self.pos < len(text):
+            ch = text[self.pos]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.state == "key":
+                        self.key = json.loads(text[self.start:self.pos + 1])
+                        self.state = "colon"
+                    elif self.state == "string":
+                        done.append(self._complete(self.pos + 1))
+                self.pos += 1
+                continue
+
+            if self.state == "start":
+                if ch == "`":
+                    newline = text.find("\n", self.pos)
+                    if newline < 0:
+                        break                     # wait for the rest of the fence line
+                    if not text.startswith("```", self.pos):
+                        raise StreamError(f"reply does not start with a JSON object: {text[:40]!r}")
+                    self.pos = newline + 1
+                    continue
+                if ch == "{":
+                    self.depth, self.state = 1, "key"
+                elif not ch.isspace():
+                    raise StreamError(f"reply does not start with a JSON object: {text[:40]!r}")
+            elif self.state == "key":
+                if ch == '"':
+                    self.in_string, self.start = True, self.pos
+                elif ch == "}" and not self.fields:
+                    self._close()
+                elif not ch.isspace():
+                    raise StreamError(f"expected a key at offset {self.pos}")
+            elif self.state == "colon":
+                if ch == ":":
+                    self.state = "value"
+                elif not ch.isspace():
+                    raise StreamError(f"expected ':' after {self.key!r}")
+            elif self.state == "value":
+                if not ch.isspace():
+                    self.start = self.pos
+                    if ch == '"':
+                        self.in_string, self.state = True, "string"
+                    elif ch in "{[":
+                        self.depth, self.state = 2, "nested"
+                    else:
+                        self.state = "scalar"
+            elif self.state == "nested":
+                if ch == '"':
+                    self.in_string = True
+                elif ch in "{[":
+                    self.depth += 1
+                elif ch in "}]":
+                    self.depth -= 1
+                    if self.depth == 1:
+                        done.append(self._complete(self.pos + 1))
+            elif self.state == "scalar":
+                if ch in ",}" or ch.isspace():
+                    done.append(self._complete(self.pos))
+                    continue                      # re-read the delimiter as "after"
+            elif self.state == "after":
+                if ch == ",":
+                    self.state = "key"
+                elif ch == "}":
+                    self._close()
+                elif not ch.isspace():
+                    raise StreamError(f"expected ',' or '}}' at offset {self.pos}")
+            elif self.state == "done":
+                if not ch.isspace() and ch != "`":
+                    raise StreamError("extra text after the JSON object")
+            self.pos += 1
+        return done
+
+    def _complete(self, end: int):
+        raw = self.text[self.start:end]
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            raise StreamError(f"invalid value for {self.key!r}: {raw[:40]!r}")
+        self.fields[self.key] = value
+        self.state = "after"
+        return self.key, value
+
+    def _close(self):
+        missing = [k for k in self.required if k not in self.fields]
+        if missing:
+            raise StreamError(f"reply is missing {', '.join(missing)}")
+        self.depth, self.state = 0, "done"
+
+    def finish(self) -> dict:
+        if self.state != "done":
+            raise StreamError("reply ended before the JSON object was complete")
+        return self.fields
+
+
+class StreamedReply:
+    """What stream_completion() read: the text, usage, and when each field completed."""
+
+    def __init__(self):
+        self.text = ""
+        self.usage = None
+        self.aborted = None          # StreamError message if the stream was cut short
+        self.field_seconds = {}
+
+
+async def stream_completion(client, required=(), on_field=None, **kwargs) -> StreamedReply:
+    """
+    Run a streaming chat completion, parsing the reply as it arrives.
+    on_field(key, value) is called for each top-level field as soon as it
+    is complete. The request is closed as soon as the reply can no longer
+    be valid; the partial text is returned and fails the caller's usual
+    parse, so it retries without waiting for the rest of the tokens.
+    """
+    reply = StreamedReply()
+    parser = StreamParser(required)
+    started = time.perf_counter()
+    stream = await client.chat.completions.create(
+        stream=True, stream_options={"include_usage": True}, **kwargs)
+    try:
+        async for chunk in stream:
+            if chunk.usage is not None:
+                reply.usage = chunk.usage
+            if not chunk.choices:
+                continue
+            piece = chunk.choices[0].delta.content or ""
+            reply.text += piece
+            for key, value in parser.feed(piece):
+                reply.field_seconds[key] = time.perf_counter() - started
+                if on_field:
+                    on_field(key, value)
+        parser.finish()
+    except StreamError as e:
+        reply.aborted = str(e)
+    finally:
+        await stream.close()
+    return reply
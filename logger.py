@@ -1,16 +1,190 @@
+import atexit
+import hashlib
+import json
 import os
+import queue
+import threading
+import time
 
 class Logger:
-    def __init__(self, log_dir="logs"):
+    """
+    Structured, buffered game logger.
+
+    Each call to log() becomes one JSON Lines record in <log_dir>/<prefix><player>.jsonl.
+    Records are queued and written by a background thread that keeps the
+    files open, so the game loop never waits on disk. Files rotate to
+    .1, .2, ... once they pass `max_bytes`. close() (also run at exit)
+    drains the queue and flushes everything.
+
+    Prompts logged with `sections` are deduplicated: every section of at
+    least MIN_BLOCK characters is stored once in <prefix>blocks.jsonl under
+    its content hash, and the record keeps only "parts" (block references
+    and the short sections inline). LogReader rebuilds the original text.
+    """
+
+    MIN_BLOCK = 200
+
+    def __init__(self, log_dir="logs", prefix="", max_queue=10000,
+                 max_bytes=50 * 1024 * 1024, backup_count=5):
         self.log_dir = log_dir
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
         os.makedirs(log_dir, exist_ok=True)
 
-    def log(self, player_name: str, message_type: str, content: str):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.files = {}
+        self.blocks_path = os.path.join(log_dir, f"{prefix}blocks.jsonl")
+        self.known_blocks = set(read_blocks(self.blocks_path))
+        self.blocks_file = None
+        self.closed = False
+        self.writer = threading.Thread(target=self._run, name="logger-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def log(self, player_name: str, message_type: str, content: str, sections=None, **fields):
         """
-        Append a block to player_name.log.
+        Queue a record for player_name.
         message_type: e.g. "PROMPT", "RESPONSE", or "USER_INPUT"
+        sections: the pieces `content` was joined from with blank lines
+                  (Player.build_prompt); stored deduplicated instead of content.
+        fields: extra structured data such as game, turn, latency or token counts.
         """
-        fname = os.path.join(self.log_dir, f"{player_name}.log")
-        with open(fname, "a", encoding="utf-8") as f:
-            f.write(f"=== {player_name} {message_type} ===\n")
-            f.write(content.strip() + "\n\n")
+        if self.closed:
+            return
+        record = {"ts": time.time(), "player": player_name, "type": message_type}
+        record.update(fields)
+        if sections:
+            record["sections"] = list(sections)
+        else:
+            record["content"] = content.strip()
+        # only blocks if the writer falls a full queue behind
+        self.queue.put(record)
+
+    def close(self):
+        """Flush all queued records and close the files."""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.writer.join()
+
+    def _path(self, player_name: str) -> str:
+        return os.path.join(self.log_dir, f"{self.prefix}{player_name}.jsonl")
+
+    def _file(self, player_name: str):
+        f = self.files.get(player_name)
+        if f is None:
+            f = open(self._path(player_name), "a", encoding="utf-8")
+            self.files[player_name] = f
+        return f
+
+    def _rotate(self, player_name: str):
+        self.files.pop(player_name).close()
+        path = self._path(player_name)
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
+
+    def _dedupe(self, record: dict):
+        # replace long sections with references into the block store
+        parts = []
+        for section in record.pop("sections"):
+            if len(section) < self.MIN_BLOCK:
+                parts.append(section)
+                continue
+            block_id = hashlib.sha256(section.encode("utf-8")).hexdigest()[:20]
+            if block_id not in self.known_blocks:
+                if self.blocks_file is None:
+                    self.blocks_file = open(self.blocks_path, "a", encoding="utf-8")
+                self.blocks_file.write(json.dumps({"id": block_id, "text": section}, ensure_ascii=False) + "\n")
+                self.known_blocks.add(block_id)
+            parts.append({"ref": block_id})
+        record["parts"] = parts
+
+    def _write(self, record: dict):
+        if "sections" in record:
+            self._dedupe(record)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        f = self._file(record["player"])
+        if f.tell() and f.tell() + len(line) > self.max_bytes:
+            self._rotate(record["player"])
+            f = self._file(record["player"])
+        f.write(line)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            # write everything already queued before flushing once
+            batch = [record]
+            while record is not None and len(batch) < 1000:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(record)
+
+            for r in batch:
+                if r is not None:
+                    self._write(r)
+            # blocks first, so a flushed record never points at an unwritten block
+            if self.blocks_file is not None:
+                self.blocks_file.flush()
+            for f in self.files.values():
+                f.flush()
+
+            if batch[-1] is None:
+                for f in self.files.values():
+                    f.close()
+                self.files.clear()
+                if self.blocks_file is not None:
+                    self.blocks_file.close()
+                    self.blocks_file = None
+                return
+
+
+def read_blocks(path: str, blocks: dict = None) -> dict:
+    """Load block-store entries from `path` into `blocks` (id -> text) and return it."""
+    blocks = {} if blocks is None else blocks
+    if not os.path.exists(path):
+        return blocks
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.endswith("\n"):
+                entry = json.loads(line)
+                blocks[entry["id"]] = entry["text"]
+    return blocks
+
+
+class LogReader:
+    """
+    Reads Logger output back, rebuilding deduplicated prompt text on demand.
+
+        reader = LogReader("logs")
+        for record in reader.records("logs/Player1.jsonl"):
+            print(record["type"], reader.text(record))
+    """
+
+    def __init__(self, log_dir="logs", prefix=""):
+        self.blocks_path = os.path.join(log_dir, f"{prefix}blocks.jsonl")
+        self.blocks = {}
+
+    def text(self, record: dict) -> str:
+        """The full content of `record`, joining its parts back together if needed."""
+        if "parts" not in record:
+            return record.get("content", "")
+        if any(isinstance(p, dict) and p["ref"] not in self.blocks for p in record["parts"]):
+            read_blocks(self.blocks_path, self.blocks)
+        return "\n\n".join(
+            self.blocks[p["ref"]] if isinstance(p, dict) else p for p in record["parts"]
+        ).strip()
+
+    def records(self, path: str):
+        """Yield each record of a log file with "content" filled in."""
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if "parts" in record:
+                    record["content"] = self.text(record)
+                yield record
@@ -0,0 +1,239 @@
+# logindex.py
+
+import argparse
+import glob
+import json
+import os
+import re
+import sqlite3
+import sys
+from logger import LogReader, read_blocks
+
+# "=== Player1 RESPONSE ===" headers of the original plain-text logs
+HEADER = re.compile(r"^=== (\S+) (\S+) ===$", re.M)
+# tournament game ids: "<first deck>-vs-<second deck>-s<seed>"
+MATCHUP = re.compile(r"^(.+)-vs-(.+)-s\d+$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id TEXT PRIMARY KEY,   -- device:inode, so rotated files are not re-read
+    path TEXT,
+    offset INTEGER,
+    turn INTEGER                -- turn counter carried between runs for text logs
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    game TEXT,
+    player TEXT,
+    deck TEXT,
+    turn INTEGER,
+    type TEXT,
+    ts REAL,
+    latency REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    retries INTEGER,
+    decisions TEXT,
+    end_turn INTEGER,
+    json_error INTEGER,         -- 1 when the model failed JSON validation
+    content_chars INTEGER,
+    content TEXT                -- NULL for PROMPT records, which are large and repetitive
+);
+CREATE INDEX IF NOT EXISTS messages_game ON messages (game, player, turn);
+CREATE INDEX IF NOT EXISTS messages_type ON messages (type);
+"""
+
+# canned queries for `logindex.py report <name>`
+QUERIES = {
+    "failed_json": """
+        SELECT game, player, turn, substr(content, 1, 120) AS error
+        FROM messages WHERE json_error = 1 ORDER BY game, player, turn""",
+    "actions_per_turn": """
+        SELECT deck, round(avg(actions), 2) AS actions_per_turn, count(*) AS turns
+        FROM (SELECT deck, game, player, turn, count(*) AS actions
+              FROM messages WHERE type = 'RESPONSE' GROUP BY game, player, turn)
+        GROUP BY deck ORDER BY deck""",
+    "latency": """
+        SELECT player, count(*) AS calls, round(avg(latency), 3) AS avg_latency,
+               round(max(latency), 3) AS max_latency
+        FROM messages WHERE type = 'RESPONSE' AND latency IS NOT NULL GROUP BY player""",
+    "early_end_turns": """
+        SELECT game, player, turn, count(*) AS corrections
+        FROM messages WHERE type = 'USER_INPUT' AND content LIKE '[Correction]%'
+        GROUP BY game, player, turn ORDER BY corrections DESC""",
+}
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def deck_for(game: str, player: str) -> str:
+    """Deck name for a player: from tournament game ids, else the player name."""
+    m = MATCHUP.match(game or "")
+    if m and player in ("Player1", "Player2"):
+        return m.group(1) if player == "Player1" else m.group(2)
+    return player
+
+
+def summarize_response(content: str):
+    """(decisions, end_turn) from a RESPONSE body, or (None, None) if it isn't JSON."""
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return None, None
+    if not isinstance(data, dict):
+        return None, None
+    decisions = data.get("decisions")
+    if decisions is not None and not isinstance(decisions, str):
+        decisions = json.dumps(decisions, ensure_ascii=False)
+    end_turn = data.get("end_turn")
+    return decisions, None if end_turn is None else int(bool(end_turn))
+
+
+def make_row(game, player, turn, message_type, content, record=None) -> tuple:
+    record = record or {}
+    decisions = end_turn = None
+    if message_type == "RESPONSE":
+        decisions, end_turn = summarize_response(content)
+    json_error = int(message_type == "ERROR" and ("JSON" in content or "tries" in content))
+    return (
+        game, player, deck_for(game, player), turn, message_type,
+        record.get("ts"), record.get("latency"),
+        record.get("prompt_tokens"), record.get("completion_tokens"), record.get("retries"),
+        decisions, end_turn, json_error, len(content),
+        None if message_type == "PROMPT" else content,
+    )
+
+
+def parse_text(text: str, game: str, turn: int):
+    """Rows from plain-text log blocks; a "Drew card" input starts the player's next turn."""
+    rows = []
+    headers = list(HEADER.finditer(text))
+    for i, m in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        player, message_type = m.group(1), m.group(2)
+        content = text[m.end():end].strip()
+        if message_type == "USER_INPUT" and content.startswith("Drew card:"):
+            turn += 1
+        rows.append(make_row(game, player, turn, message_type, content))
+    return rows, turn
+
+
+def parse_jsonl(lines: list, reader: LogReader):
+    rows = []
+    for line in lines:
+        record = json.loads(line)
+        content = reader.text(record)
+        rows.append(make_row(record.get("game") or "", record["player"], record.get("turn"),
+                             record["type"], content, record))
+    return rows
+
+
+def block_reader(log_dir: str) -> LogReader:
+    """A LogReader that knows the blocks of every logger prefix in `log_dir`."""
+    reader = LogReader(log_dir)
+    for path in glob.glob(os.path.join(log_dir, "*blocks.jsonl")):
+        read_blocks(path, reader.blocks)
+    return reader
+
+
+def ingest_file(conn: sqlite3.Connection, path: str, readers: dict = None) -> int:
+    """
+    Index whatever was appended to `path` since the last run; returns rows added.
+    `readers` (log dir -> block_reader) is shared across one ingest run so each
+    directory's block files are read once, not once per log file.
+    """
+    st = os.stat(path)
+    file_id = f"{st.st_dev}:{st.st_ino}"
+    row = conn.execute("SELECT offset, turn FROM files WHERE file_id = ?", (file_id,)).fetchone()
+    offset, turn = row if row else (0, 0)
+    if offset > st.st_size:          # truncated or replaced under the same inode
+        offset, turn = 0, 0
+    if offset == st.st_size:
+        return 0
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+
+    if ".jsonl" in os.path.basename(path):
+        # only complete lines; a partial last line is picked up next time
+        complete = data[:data.rfind(b"\n") + 1]
+        lines = complete.decode("utf-8").splitlines()
+        log_dir = os.path.dirname(path)
+        readers = {} if readers is None else readers
+        if log_dir not in readers:
+            readers[log_dir] = block_reader(log_dir)
+        rows = parse_jsonl(lines, readers[log_dir])
+        offset += len(complete)
+    else:
+        # the text logger wrote whole blocks per call, so everything up to EOF is complete
+        game = os.path.basename(path).rsplit(".", 1)[0]
+        game = re.sub(r"_?Player\d+$", "", game) or game
+        rows, turn = parse_text(data.decode("utf-8"), game, turn)
+        offset += len(data)
+
+    conn.executemany(
+        "INSERT INTO messages (game, player, deck, turn, type, ts, latency, prompt_tokens, "
+        "completion_tokens, retries, decisions, end_turn, json_error, content_chars, content) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.execute("INSERT OR REPLACE INTO files (file_id, path, offset, turn) VALUES (?, ?, ?, ?)",
+                 (file_id, path, offset, turn))
+    conn.commit()
+    return len(rows)
+
+
+def log_files(paths: list) -> list:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in ("*.log", "*.jsonl", "*.jsonl.*"):
+                files.extend(glob.glob(os.path.join(path, pattern)))
+        else:
+            files.append(path)
+    return sorted(f for f in files if not os.path.basename(f).endswith("blocks.jsonl"))
+
+
+def print_rows(cursor):
+    names = [d[0] for d in cursor.description]
+    print("\t".join(names))
+    for row in cursor:
+        print("\t".join("" if v is None else str(v) for v in row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index PTCG AI logs into SQLite and query them")
+    parser.add_argument("--db", default=os.path.join("logs", "index.sqlite"))
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("ingest", help="index new log data (text .log and structured .jsonl)")
+    p.add_argument("paths", nargs="*", default=["logs"])
+    p = sub.add_parser("query", help="run an SQL query against the index")
+    p.add_argument("sql")
+    p = sub.add_parser("report", help="run a canned query")
+    p.add_argument("name", choices=sorted(QUERIES))
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == "ingest":
+        total, readers = 0, {}
+        for path in log_files(args.paths):
+            added = ingest_file(conn, path, readers)
+            if added:
+                print(f"{path}: {added} records")
+            total += added
+        print(f"Indexed {total} new records into {args.db}")
+    elif args.command == "query":
+        try:
+            print_rows(conn.execute(args.sql))
+        except sqlite3.Error as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+    else:
+        print_rows(conn.execute(QUERIES[args.name]))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,132 +3,419 @@
 import openai
 import sys
 import json
-from config import OPENAI_API_KEY, DECKS, ORDER, LOG_DIR, INITIAL_SETUPS
+import time
+import asyncio
+import argparse
+from config import OPENAI_API_KEY, OPENAI_BASE_URL, DECKS, ORDER, LOG_DIR, INITIAL_SETUPS
 from logger import Logger
-from player import Player
-
-def main():
-    openai.api_key = OPENAI_API_KEY
-    logger = Logger(LOG_DIR)
+from player import PENDING, Player, estimate_tokens
+from driver import end_reason, InteractiveDriver, AutoDriver, set_aside
+from client import get_async_client, close_async_client
+from ratelimit import add_rate_limit_args, make_limiter, limit_client
+from backends import load_router, route_client
+from cache import MODES, make_cache
+from metrics import Metrics, action_fields, add_metrics_args, make_metrics
+from board import Board
+from rules import MAX_REJECTIONS
+from checkpoint import Checkpoint
+from events import PublicLog
+import speculate
 
+def make_players(player_cls=Player, decks=DECKS, order=ORDER, setups=INITIAL_SETUPS, *, cache=None,
+                 board=None, memory_ops=False, stream=False, schema=False, rules=False, best_of=1,
+                 public_log=None):
     # 1) Initialize players
     players = []
-    for name, order in ORDER:
-        deck = DECKS.get(name)
+    for name, seat in order:
+        deck = decks.get(name)
         if deck is None:
             print(f"ERROR: No deck found for {name} in config.DECKS")
             sys.exit(1)
-        initial_setup = INITIAL_SETUPS.get(name)
+        initial_setup = setups.get(name)
         if initial_setup is None:
             print(f"ERROR: No initial setup found for {name} in config.INITIAL_SETUPS")
             sys.exit(1)
-        p = Player(name, deck, order, initial_setup)
+        p = player_cls(name, deck, seat, initial_setup)
         p.board_state = {}            # shared board info
         p.pending_new_turn = False    # track new-turn notice
+        p.cache = cache               # shared response cache (None = off)
+        p.stream = stream             # streamed replies with early abort
+        p.schema = schema             # schema-constrained replies, if the backend supports them
+        p.best_of = best_of           # candidate replies per action, the best-scoring one is kept
+        if board is not None:
+            p.use_board(board)        # engine-kept typed board instead of public_info
+        if memory_ops:
+            p.use_memory_ops()        # memory edits instead of full rewrites
+        if rules:
+            p.use_rules()             # reject illegal decisions locally
+        if public_log is not None:
+            p.use_public_log(public_log)  # board deltas from the shared event log
         players.append(p)
 
     # mark Player1 as starting a new turn
     players[0].pending_new_turn = True
+    return players
+
+async def play_game(players, driver, logger, client, *, game_id="", quiet=False, metrics=None,
+                    checkpoint=None, loop=None, speculative=False) -> dict:
+    """
+    Play one game to completion on the running event loop.
+    `game_id` tags log records and console lines so concurrent games stay apart;
+    `quiet` silences the console. Per-call model metrics go to `metrics`
+    (a metrics.Metrics, shared across games if given). With a `checkpoint`
+    (checkpoint.Checkpoint) the game is snapshotted after every completed
+    action; `loop` is the saved loop state to resume from. With `speculative`,
+    the likely next request is sent while the operator writes a note or
+    confirms the end of turn, and used if they take the default path.
+    Returns a small result summary.
+    """
+    metrics = metrics or Metrics()
+
+    def say(message):
+        if not quiet:
+            print(f"[{game_id}] {message}" if game_id else message)
+
+    def log(player, message_type, content, **fields):
+        logger.log(player.name, message_type, content, game=game_id, turn=turn, **fields)
+
+    def add_pending(player, text):
+        # **append** to the notes for the player's next prompt rather than overwrite
+        if player.pending_user_input:
+            player.pending_user_input += "\n" + text
+        else:
+            player.pending_user_input = text
+
+    streamed = {}
+
+    def show_early(key, value):
+        # streaming: print decisions as soon as they arrive, before the rest of the reply
+        if key == "decisions":
+            streamed[key] = value
+            say(f"Decisions:\n{value}")
+
+    speculation = None
+    prefetch = {"used": 0, "cancelled": 0}
+
+    async def ask(method, player):
+        # with a prefetch in flight, wait for the operator off the event loop
+        if speculation is not None:
+            return await asyncio.to_thread(method, player)
+        return method(player)
+
+    def drop_speculation():
+        nonlocal speculation
+        if speculation is not None:
+            speculation.cancel()
+            prefetch["cancelled"] += 1
+            speculation = None
+
+    def save(result=None):
+        if checkpoint is not None:
+            checkpoint.save(players, driver, {"turn": turn, "rejections": rejections,
+                                              "last_player_index": last_player_index}, result)
 
     turn = 0
+    rejections = 0
     last_player_index = None
-
-    print("=== PTCG AI Simulation ===")
-    print("Type 'end' at any prompt to stop the game.\n")
+    if loop:
+        turn, rejections, last_player_index = loop["turn"], loop["rejections"], loop["last_player_index"]
+        say(f"Resuming at turn {turn}.")
+    else:
+        save()              # the dealt game, so even a failure on the first action can be resumed
+    error = None
+    started = time.monotonic()
 
     while True:
         current_index = turn % 2
         current = players[current_index]
         opponent = players[(turn + 1) % 2]
 
-        print(f"\n--- {current.name}'s turn ({current.order}) ---")
+        say(f"\n--- {current.name}'s turn ({current.order}) ---")
 
         # 2) Draw Phase: only when we switch players
         if current_index != last_player_index:
-            draw_input = input("Draw a card (enter card name)> ").strip()
+            draw_input = driver.draw(current)
             if draw_input.lower() == "end":
-                print("Game ended by user.")
+                say(f"Game ended {end_reason(driver)}.")
                 break
-            logger.log(current.name, "USER_INPUT", f"Drew card: {draw_input}")
-            current.pending_draw = draw_input
+            log(current, "USER_INPUT", f"Drew card: {draw_input}")
+            current.receive_draw(draw_input)
             last_player_index = current_index
 
-        # 3) Build & log the prompt
+        # 3) Build & log the prompt; the pending inputs it uses up (draw, new-turn
+        #    notice, notes, opponent info) are put back if the reply is rejected,
+        #    so the corrected prompt still carries them
+        shown = {field: getattr(current, field) for field in PENDING}
         prompt = current.build_prompt()
-        logger.log(current.name, "PROMPT", prompt)
+        log(current, "PROMPT", prompt, sections=current.last_prompt_sections)
 
-        # 4) Send to AI
+        # 4) Send to AI, or take the reply prefetched while the operator was deciding
+        asked = time.monotonic()
+        prefetched = speculation is not None and speculation.matches(current_index, prompt)
+        if not prefetched:
+            drop_speculation()
         try:
-            data = current.take_turn(prompt)
+            if prefetched:
+                data = await speculation.result(current)
+            else:
+                data = await current.take_turn_async(prompt, client, show_early if current.stream else None)
         except Exception as e:
-            error_msg = f"AI turn failed for {current.name}: {e}"
-            print(f"ERROR during AI turn: {e}")
-            logger.log(current.name, "ERROR", error_msg)
+            error = f"AI turn failed for {current.name}: {e}"
+            say(f"ERROR during AI turn: {e}")
+            log(current, "ERROR", error, **action_fields(current.last_calls))
+            metrics.observe(game_id, current.name, current.last_calls, failure=type(e).__name__)
             break
+        finally:
+            if prefetched:
+                prefetch["used"] += 1
+                speculation = None
+
+        # 5) Log the raw JSON with latency, retries and token usage (incl. provider prompt-cache hits)
+        log(current, "RESPONSE", json.dumps(data, ensure_ascii=False),
+            latency=round(time.monotonic() - asked, 3),
+            prefix_tokens=estimate_tokens(current.prompt_prefix), prefetched=prefetched,
+            scores=current.last_scores, **action_fields(current.last_calls))
+        metrics.observe(game_id, current.name, current.last_calls)
 
-        # 5) Log the raw JSON
-        logger.log(current.name, "RESPONSE", json.dumps(data, indent=2))
+        # 5b) Check the decisions against the tracked hand and board; an illegal
+        #     reply is not applied and is asked again with a precise correction
+        if current.rules is not None:
+            problems = current.rules.review(data.get("decisions", ""), strict=rejections < MAX_REJECTIONS)
+            if problems and rejections < MAX_REJECTIONS:
+                rejections += 1
+                correction = current.rules.correction(problems)
+                say(correction)
+                log(current, "USER_INPUT", correction)
+                for field, value in shown.items():
+                    setattr(current, field, value)
+                add_pending(current, correction)
+                save()
+                continue
+        rejections = 0
 
-        # 6) Update private memory
-        raw_mem = data.get("memory", "")
-        current.memory = raw_mem if isinstance(raw_mem, str) else json.dumps(raw_mem)
+        # 6) Update private memory: apply memory_ops edits, or take the rewritten memory
+        if current.notebook is not None:
+            errors = current.notebook.apply_all(data.get("memory_ops"))
+            if errors:
+                correction = "[Memory] " + "\n".join(errors)
+                log(current, "USER_INPUT", correction)
+                add_pending(current, correction)
+            current.memory = current.notebook.render()
+        else:
+            raw_mem = data.get("memory", "")
+            current.memory = raw_mem if isinstance(raw_mem, str) else json.dumps(raw_mem)
 
         # 7) Optional extra notes
         extra = data.get("to_memorize")
         if extra:
-            note = extra if isinstance(extra, str) else json.dumps(extra)
-            current.memory += "\n" + note
+            current.remember(extra if isinstance(extra, str) else json.dumps(extra))
 
         # 8) Record decisions
         current.last_decisions = data.get("decisions", "")
-        print(f"Decisions:\n{current.last_decisions}")
+        if streamed.pop("decisions", None) != current.last_decisions:
+            say(f"Decisions:\n{current.last_decisions}")
+        if current.public_log is not None:
+            current.public_log.record_action(current.name, current.last_decisions)
 
         # 9) Handle AI‐requested user input
         if "user_input_request" in data:
             req = data["user_input_request"]
-            print(f"\n>> {current.name} requests input: {req}")
-            user_in = input("Your response> ").strip()
+            say(f"\n>> {current.name} requests input: {req}")
+            user_in = driver.answer_request(current, req)
             if user_in.lower() == "end":
-                print("Game ended by user.")
+                say(f"Game ended {end_reason(driver)}.")
                 break
-            logger.log(current.name, "USER_INPUT", f"{req} -> {user_in}")
-            current.memory += f"\n[User input: {user_in}]"
+            log(current, "USER_INPUT", f"{req} -> {user_in}")
+            current.remember(f"[User input: {user_in}]")
 
-        # 10) Free-form CLI note
-        cont = input("\nPress Enter to continue, or type a note to include in AI prompt> ").strip()
+        # 10) Update the shared board: apply reported actions to the typed board,
+        #     or share the AI's free-text public_info; with a public event log,
+        #     record what changed and mark it seen by the current player
+        board = current.board
+        if board is not None:
+            errors = board.apply_all(current.name, data.get("actions"))
+            if errors:
+                correction = "[Board] " + "\n".join(errors)
+                log(current, "USER_INPUT", correction)
+                add_pending(current, correction)
+        else:
+            board = data.get("public_info")
+            if board:
+                for p in players:
+                    p.board_state = board
+        if current.public_log is not None:
+            if board:
+                current.public_log.record_board(current.name, board)
+            current.public_log.seen(current)
+
+        # 10b) Speculation: everything left depends only on the operator, so
+        #      send the request that follows "no note" and "yes" right away
+        if speculative:
+            speculation = speculate.start(players, current_index, bool(data.get("end_turn")), driver, client)
+
+        # 11) Free-form CLI note
+        cont = await ask(driver.note, current)
         if cont.lower() == "end":
-            print("Game ended by user.")
+            say(f"Game ended {end_reason(driver)}.")
+            drop_speculation()
             break
         elif cont:
-            logger.log(current.name, "USER_INPUT", f"[Pending note] {cont}")
-            # **append** rather than overwrite
-            if current.pending_user_input:
-                current.pending_user_input += "\n" + cont
-            else:
-                current.pending_user_input = cont
-
-        # 11) Update shared board_state
-        board = data.get("public_info")
-        if board:
-            for p in players:
-                p.board_state = board
+            drop_speculation()
+            log(current, "USER_INPUT", f"[Pending note] {cont}")
+            add_pending(current, cont)
 
         # 12) End-Turn Confirmation
         if data.get("end_turn"):
-            confirm = input("\nAI wants to end its turn. Confirm end turn? (yes/no)> ").strip().lower()
+            confirm = await ask(driver.confirm_end_turn, current)
             if confirm == "yes":
                 turn += 1
                 # mark next player’s new turn
                 players[turn % 2].pending_new_turn = True
             else:
+                drop_speculation()
                 correction = "Please continue your turn; I think you ended prematurely."
-                logger.log(current.name, "USER_INPUT", f"[Correction] {correction}")
-                # **append** correction to existing pending_user_input
-                if current.pending_user_input:
-                    current.pending_user_input += "\n" + correction
-                else:
-                    current.pending_user_input = correction
+                log(current, "USER_INPUT", f"[Correction] {correction}")
+                add_pending(current, correction)
         # if end_turn is false, stay on same player
 
+        # 13) Snapshot the game so a crash resumes from here
+        save()
+
+    drop_speculation()
+    seconds = time.monotonic() - started
+    say(f"Game over after {turn} turns in {seconds:.1f}s.")
+    if speculative:
+        say(f"Prefetched replies: {prefetch['used']} used, {prefetch['cancelled']} cancelled.")
+    say(metrics.summary(game_id))
+    metrics.flush()
+    result = {"game_id": game_id, "turns": turn, "seconds": seconds, "error": error, "ended": getattr(driver, "ended", None), "prefetch": prefetch}
+    if error is None:
+        save(result)        # a failed game keeps its last good snapshot to resume from
+    return result
+
+def restore(checkpoint, player_cls, cache=None):
+    """
+    (players, driver, loop, result) from `checkpoint`'s snapshot; `result` is
+    set if that game had already finished.
+    """
+    started = time.monotonic()
+    state = checkpoint.load(player_cls, cache)
+    print(f"Restored {checkpoint.path} in {(time.monotonic() - started) * 1000:.1f} ms.")
+    return state["players"], state["driver"], state["loop"], state["result"]
+
+async def run_main(driver, *, cache=None, metrics=None, typed_board=False, memory_ops=False, stream=False,
+                   schema=False, rules=False, deal=False, checkpoint=None, resume=False, speculative=False,
+                   limiter=None, best_of=1, router=None, public_log=None):
+    loop = None
+    if resume and not checkpoint.exists():
+        print(f"No snapshot at {checkpoint.path}; starting a new game.")
+        resume = False
+    if resume:
+        # the snapshot's players and driver carry the original game's options
+        players, driver, loop, result = restore(checkpoint, Player, cache)
+        if result is not None:
+            print(f"That game already finished after {result['turns']} turns.")
+            return result
+    else:
+        board = Board.for_players([name for name, _ in ORDER]) if typed_board else None
+        # deal opening hands and prizes from the driver's seeded decks instead of config.INITIAL_SETUPS
+        if deal:
+            setups = {name: driver.deal(name) for name, _ in ORDER}
+        else:
+            setups = INITIAL_SETUPS
+            set_aside(driver, setups)
+        players = make_players(setups=setups, cache=cache, board=board, memory_ops=memory_ops, stream=stream,
+                               schema=schema, rules=rules, best_of=best_of, public_log=public_log)
+    logger = Logger(LOG_DIR)
+    # optional client-side RPM/TPM limiting (ratelimit.RateLimiter) and
+    # per-player/phase routing over several model backends (backends.Router)
+    client = limit_client(get_async_client(OPENAI_API_KEY, base_url=OPENAI_BASE_URL), limiter)
+    client = route_client(client, router)
+    try:
+        return await play_game(players, driver, logger, client, metrics=metrics, checkpoint=checkpoint, loop=loop,
+                               speculative=speculative)
+    finally:
+        if router is not None:
+            print(router.summary())
+            await router.close()
+        await close_async_client()
+        logger.close()
+
+def main(driver=None, *, cache=None, metrics=None, typed_board=False, memory_ops=False, stream=False,
+         schema=False, rules=False, deal=False, checkpoint=None, resume=False, speculative=False,
+         limiter=None, best_of=1, router=None, public_log=None):
+    openai.api_key = OPENAI_API_KEY
+
+    print("=== PTCG AI Simulation ===")
+    print("Type 'end' at any prompt to stop the game.\n")
+    asyncio.run(run_main(driver or InteractiveDriver(), cache=cache, metrics=metrics, typed_board=typed_board,
+                         memory_ops=memory_ops, stream=stream, schema=schema, rules=rules, deal=deal,
+                         checkpoint=checkpoint, resume=resume, speculative=speculative, limiter=limiter,
+                         best_of=best_of, router=router, public_log=public_log))
+
+def add_cache_args(parser):
+    parser.add_argument("--cache-mode", choices=MODES, default="off",
+                        help="record: reuse and store replies; replay: only reuse (deterministic)")
+    parser.add_argument("--cache-dir", default="cache")
+    parser.add_argument("--cache-mb", type=int, default=256, help="cache size cap before LRU eviction")
+
+def add_checkpoint_args(parser):
+    parser.add_argument("--checkpoint", default="cache/game.ckpt",
+                        help="snapshot file rewritten after every action ('' to turn off)")
+    parser.add_argument("--resume", action="store_true", help="continue the game saved in --checkpoint")
+
+# options only main.py (the memory variant) supports: args attribute -> flag;
+# main_no_mem.py shares parse_args and rejects them when they differ from the default
+MEMORY_ONLY = {"typed_board": "--typed-board", "memory_ops": "--memory-ops",
+               "rules": "--rules", "speculate": "--speculate", "best_of": "--best-of", "public_log": "--public-log"}
+
+def parse_args(argv=None, memory=True):
+    """Command-line options of main.py; main_no_mem.py passes memory=False and rejects the memory-only ones."""
+    parser = argparse.ArgumentParser(description="PTCG AI simulation")
+    parser.add_argument("--auto", action="store_true", help="run unattended with seeded draws")
+    parser.add_argument("--deal", action="store_true",
+                        help="deal hands, prizes and draws from a seeded shuffle of the decklists")
+    parser.add_argument("--seed", type=int, default=None, help="shuffle seed for --auto and --deal")
+    parser.add_argument("--max-turns", type=int, default=None, help="stop --auto games after this many turns")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream replies, show decisions early and cut invalid replies short")
+    parser.add_argument("--schema", action="store_true",
+                        help="ask for schema-constrained JSON replies (falls back if unsupported)")
+    parser.add_argument("--rules", action="store_true",
+                        help="reject decisions that use cards not in hand and similar mistakes locally")
+    parser.add_argument("--speculate", action="store_true",
+                        help="send the likely next request while the operator is still typing (main.py)")
+    parser.add_argument("--best-of", type=int, default=1,
+                        help="ask for N candidate replies per action and keep the best-scoring one (main.py; "
+                             "scored with --typed-board and --rules)")
+    parser.add_argument("--typed-board", action="store_true",
+                        help="keep the public board in the engine; the AI reports actions")
+    parser.add_argument("--memory-ops", action="store_true",
+                        help="the AI edits a structured memory instead of rewriting it each action")
+    parser.add_argument("--public-log", action="store_true",
+                        help="send each player only the board changes since its last action (main.py)")
+    parser.add_argument("--snapshot-every", type=int, default=5,
+                        help="with --public-log, a full board snapshot every N actions per player")
+    add_cache_args(parser)
+    add_checkpoint_args(parser)
+    add_rate_limit_args(parser)
+    parser.add_argument("--backends", default=None,
+                        help="JSON file of model backends and per-player/phase routes (see backends.py)")
+    add_metrics_args(parser)
+    args = parser.parse_args(argv)
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs a --checkpoint file")
+    used = [flag for key, flag in MEMORY_ONLY.items() if getattr(args, key) != parser.get_default(key)]
+    if not memory and used:
+        parser.error(f"{', '.join(used)} need main.py (the memory variant)")
+    return args
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(AutoDriver(DECKS, args.seed, max_turns=args.max_turns) if args.auto
+         else InteractiveDriver(DECKS if args.deal else None, args.seed),
+         cache=make_cache(args.cache_mode, args.cache_dir, args.cache_mb), metrics=make_metrics(args),
+         typed_board=args.typed_board, memory_ops=args.memory_ops, stream=args.stream, schema=args.schema,
+         rules=args.rules, deal=args.deal, checkpoint=Checkpoint(args.checkpoint) if args.checkpoint else None,
+         resume=args.resume, speculative=args.speculate, limiter=make_limiter(args), best_of=args.best_of,
+         router=load_router(args.backends), public_log=PublicLog(args.snapshot_every) if args.public_log else None)
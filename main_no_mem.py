@@ -1,62 +1,77 @@
 # main_no_mem.py
 
 import openai
-import sys
 import json
-from config import OPENAI_API_KEY, DECKS, ORDER, LOG_DIR, INITIAL_SETUPS
+import time
+import asyncio
+from config import OPENAI_API_KEY, OPENAI_BASE_URL, DECKS, ORDER, LOG_DIR, INITIAL_SETUPS
 from logger import Logger
 from player_no_mem import Player
-
-def main():
-    openai.api_key = OPENAI_API_KEY
-    logger = Logger(LOG_DIR)
-
-    # 1) Initialize players
-    players = []
-    for name, order in ORDER:
-        deck = DECKS.get(name)
-        if deck is None:
-            print(f"ERROR: No deck found for {name} in config.DECKS")
-            sys.exit(1)
-        initial_setup = INITIAL_SETUPS.get(name)
-        if initial_setup is None:
-            print(f"ERROR: No initial setup found for {name} in config.INITIAL_SETUPS")
-            sys.exit(1)
-        p = Player(name, deck, order, initial_setup)
-        players.append(p)
-
-    # Mark that Player1 is starting
-    players[0].pending_new_turn = True
+from driver import end_reason, NoMemInteractiveDriver, AutoDriver, set_aside
+from client import get_async_client, close_async_client
+from ratelimit import make_limiter, limit_client
+from backends import load_router, route_client
+from main import make_players, parse_args, restore
+from checkpoint import Checkpoint
+from cache import make_cache
+from metrics import Metrics, action_fields, make_metrics
+
+async def play_game(players, driver, logger, client, *, game_id="", quiet=False, metrics=None,
+                    checkpoint=None, loop=None) -> dict:
+    # see main.play_game; this variant keeps chat history instead of memory
+    metrics = metrics or Metrics()
+    def say(message):
+        if not quiet:
+            print(f"[{game_id}] {message}" if game_id else message)
+
+    def log(player, message_type, content, **fields):
+        logger.log(player.name, message_type, content, game=game_id, turn=turn, **fields)
+
+    streamed = {}
+
+    def show_early(key, value):
+        # streaming: print decisions as soon as they arrive
+        if key == "decisions":
+            streamed[key] = value
+            say(f"Decisions:\n{value}")
+
+    def save(result=None):
+        if checkpoint is not None:
+            checkpoint.save(players, driver, {"turn": turn, "last_player": last_player}, result)
 
     turn = 0
     last_player = None
-
-    print("=== PTCG AI Simulation (No Memory; Limited History) ===")
-    print("Type 'end' at any prompt to stop the game.\n")
+    if loop:
+        turn, last_player = loop["turn"], loop["last_player"]
+        say(f"Resuming at turn {turn}.")
+    else:
+        save()
+    error = None
+    started = time.monotonic()
 
     while True:
         idx = turn % 2
         current = players[idx]
         opponent = players[(turn + 1) % 2]
 
-        print(f"\n--- {current.name}'s turn ({current.order}) ---")
+        say(f"\n--- {current.name}'s turn ({current.order}) ---")
 
         # 2) Draw + public info update on actual turn change
         if idx != last_player:
-            draw = input("Draw a card (enter card name)> ").strip()
+            draw = driver.draw(current)
             if draw.lower()=="end":
-                print("Game ended by user."); break
-            logger.log(current.name, "USER_INPUT", f"Drew card: {draw}")
+                say(f"Game ended {end_reason(driver)}."); break
+            log(current, "USER_INPUT", f"Drew card: {draw}")
             current.pending_draw = draw
 
-            pub = input("Enter updated public info as JSON> ").strip()
+            pub = driver.public_info(current)
             if pub.lower()=="end":
-                print("Game ended by user."); break
+                say(f"Game ended {end_reason(driver)}."); break
             try:
                 board = json.loads(pub)
             except json.JSONDecodeError:
                 board = pub
-            logger.log(current.name, "USER_INPUT", f"Updated public_info: {pub}")
+            log(current, "USER_INPUT", f"Updated public_info: {pub}")
             for p in players:
                 p.board_state = board
 
@@ -65,43 +80,50 @@ def main():
         # 3) Build our next user message
         user_msg = current.build_prompt()
 
-        # 4) Log a HISTORY summary (roles of last 5 messages)
-        hist = current.history[-11:]  # includes system + 10 last
+        # 4) Log a HISTORY summary (roles of the messages sent, and their size)
+        hist = current.history.messages()
         roles = [m["role"] for m in hist]
-        logger.log(current.name, "HISTORY", ",".join(roles))
+        log(current, "HISTORY", ",".join(roles), tokens=current.history.tokens(),
+            summarized=len(current.history.summary))
 
         # 5) Send user_msg to AI
-        logger.log(current.name, "PROMPT", user_msg)
+        log(current, "PROMPT", user_msg)
+        asked = time.monotonic()
         try:
-            data = current.take_turn(user_msg)
+            data = await current.take_turn_async(user_msg, client, show_early if current.stream else None)
         except Exception as e:
-            print(f"ERROR during AI turn: {e}")
-            logger.log(current.name, "ERROR", str(e))
+            error = str(e)
+            say(f"ERROR during AI turn: {e}")
+            log(current, "ERROR", error, **action_fields(current.last_calls))
+            metrics.observe(game_id, current.name, current.last_calls, failure=type(e).__name__)
             break
 
         # 6) Log raw JSON
-        logger.log(current.name, "RESPONSE", json.dumps(data, indent=2))
+        log(current, "RESPONSE", json.dumps(data, ensure_ascii=False),
+            latency=round(time.monotonic() - asked, 3), **action_fields(current.last_calls))
+        metrics.observe(game_id, current.name, current.last_calls)
 
         # 7) Record the AI’s decisions
         current.last_decisions = data["decisions"]
-        print(f"Decisions:\n{current.last_decisions}")
+        if streamed.pop("decisions", None) != current.last_decisions:
+            say(f"Decisions:\n{current.last_decisions}")
 
         # 8) User resolves any requests
         if "user_input_request" in data:
             req = data["user_input_request"]
-            print(f"\n>> {current.name} requests input: {req}")
-            res = input("Your response> ").strip()
+            say(f"\n>> {current.name} requests input: {req}")
+            res = driver.answer_request(current, req)
             if res.lower()=="end":
-                print("Game ended by user."); break
-            logger.log(current.name, "USER_INPUT", f"{req} -> {res}")
+                say(f"Game ended {end_reason(driver)}."); break
+            log(current, "USER_INPUT", f"{req} -> {res}")
             current.pending_user_input = res
 
         # 9) Free-form note
-        note = input("\nPress Enter to continue, or type a note> ").strip()
+        note = driver.note(current)
         if note.lower()=="end":
-            print("Game ended by user."); break
+            say(f"Game ended {end_reason(driver)}."); break
         if note:
-            logger.log(current.name, "USER_INPUT", f"[Note] {note}")
+            log(current, "USER_INPUT", f"[Note] {note}")
             if current.pending_user_input:
                 current.pending_user_input += "\n" + note
             else:
@@ -114,17 +136,74 @@ def main():
 
         # 11) Confirm end_turn
         if data.get("end_turn"):
-            c = input("\nAI wants to end turn. Confirm? (yes/no)> ").strip().lower()
+            c = driver.confirm_end_turn(current)
             if c=="yes":
                 turn += 1
                 players[turn%2].pending_new_turn = True
             else:
                 corr = "Please continue your turn; I think you ended prematurely."
-                logger.log(current.name, "USER_INPUT", f"[Correction] {corr}")
+                log(current, "USER_INPUT", f"[Correction] {corr}")
                 if current.pending_user_input:
                     current.pending_user_input += "\n" + corr
                 else:
                     current.pending_user_input = corr
 
+        # 12) Snapshot the game (history included) so a crash resumes from here
+        save()
+
+    seconds = time.monotonic() - started
+    say(f"Game over after {turn} turns in {seconds:.1f}s.")
+    say(metrics.summary(game_id))
+    metrics.flush()
+    result = {"game_id": game_id, "turns": turn, "seconds": seconds, "error": error, "ended": getattr(driver, "ended", None)}
+    if error is None:
+        save(result)
+    return result
+
+async def run_main(driver, *, cache=None, metrics=None, stream=False, schema=False, deal=False,
+                   checkpoint=None, resume=False, limiter=None, router=None):
+    loop = None
+    if resume and not checkpoint.exists():
+        print(f"No snapshot at {checkpoint.path}; starting a new game.")
+        resume = False
+    if resume:
+        players, driver, loop, result = restore(checkpoint, Player, cache)
+        if result is not None:
+            print(f"That game already finished after {result['turns']} turns.")
+            return result
+    else:
+        if deal:
+            setups = {name: driver.deal(name) for name, _ in ORDER}
+        else:
+            setups = INITIAL_SETUPS
+            set_aside(driver, setups)
+        players = make_players(Player, setups=setups, cache=cache, stream=stream, schema=schema)
+    logger = Logger(LOG_DIR)
+    client = route_client(limit_client(get_async_client(OPENAI_API_KEY, base_url=OPENAI_BASE_URL), limiter), router)
+    try:
+        return await play_game(players, driver, logger, client, metrics=metrics, checkpoint=checkpoint, loop=loop)
+    finally:
+        if router is not None:
+            print(router.summary())
+            await router.close()
+        await close_async_client()
+        logger.close()
+
+def main(driver=None, *, cache=None, metrics=None, stream=False, schema=False, deal=False,
+         checkpoint=None, resume=False, limiter=None, router=None):
+    openai.api_key = OPENAI_API_KEY
+
+    print("=== PTCG AI Simulation (No Memory; Limited History) ===")
+    print("Type 'end' at any prompt to stop the game.\n")
+    asyncio.run(run_main(driver or NoMemInteractiveDriver(), cache=cache, metrics=metrics, stream=stream,
+                         schema=schema, deal=deal, checkpoint=checkpoint, resume=resume, limiter=limiter,
+                         router=router))
+
 if __name__ == "__main__":
-    main()
+    args = parse_args(memory=False)
+    main(AutoDriver(DECKS, args.seed, max_turns=args.max_turns) if args.auto
+         else NoMemInteractiveDriver(DECKS if args.deal else None, args.seed),
+         cache=make_cache(args.cache_mode, args.cache_dir, args.cache_mb), metrics=make_metrics(args),
+         stream=args.stream, schema=args.schema, deal=args.deal,
+         checkpoint=Checkpoint(args.checkpoint) if args.checkpoint else None, resume=args.resume,
+         limiter=make_limiter(args), router=load_router(args.backends))
@@ -0,0 +1,237 @@
+# metrics.py
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# upper bounds (seconds) of the model-call latency histogram
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 40, 80)
+
+
+def call_record(attempt: int, seconds: float, resp=None, cache_hit: bool = False,
+                schema: bool = False, backend: str = None) -> dict:
+    """
+    One model call (or cache hit) as kept in Player.last_calls; `schema` marks
+    a structured-output (schema-constrained) request and `backend` names the
+    backends.Backend that answered, when routing is on. For a
+    streamed reply (jsonstream.StreamedReply) this also notes whether it
+    was cut short and when "decisions" had arrived.
+    """
+    usage = getattr(resp, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "attempt": attempt,
+        "seconds": seconds,
+        "prompt_tokens": getattr(usage, "prompt_tokens", None) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", None) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+        "parse_seconds": 0.0,
+        "cache_hit": cache_hit,
+        "schema": schema,
+        "aborted": getattr(resp, "aborted", None) is not None,
+        "first_output_seconds": getattr(resp, "field_seconds", {}).get("decisions"),
+        "backend": backend,
+        "error": None,
+    }
+
+
+def timed_parse(call: dict, parse, raw: str):
+    """Run parse(raw), adding its time to `call` and noting any validation failure there."""
+    started = time.perf_counter()
+    try:
+        return parse(raw)
+    except (json.JSONDecodeError, KeyError) as e:
+        call["error"] = type(e).__name__
+        raise
+    finally:
+        call["parse_seconds"] += time.perf_counter() - started
+
+
+def retries(calls: list) -> int:
+    """Attempts after the first; best-of-N candidates sent in parallel share their attempt number."""
+    return max(len({c["attempt"] for c in calls}) - 1, 0)
+
+
+def action_fields(calls: list) -> dict:
+    """Totals over one take_turn's calls, for log records."""
+    return {
+        "calls": sum(1 for c in calls if not c["cache_hit"]),
+        "retries": retries(calls),
+        "prompt_tokens": sum(c["prompt_tokens"] for c in calls),
+        "completion_tokens": sum(c["completion_tokens"] for c in calls),
+        "cached_tokens": sum(c["cached_tokens"] for c in calls),
+        "cache_hit": any(c["cache_hit"] for c in calls),
+        "schema": any(c["schema"] for c in calls),
+        "aborted": sum(1 for c in calls if c["aborted"]),
+        "first_output_seconds": next((c["first_output_seconds"] for c in calls
+                                      if c["first_output_seconds"] is not None), None),
+        "backend": next((c["backend"] for c in reversed(calls) if c["backend"]), None),
+    }
+
+
+class PlayerStats:
+    __slots__ = ("actions", "calls", "retries", "cache_hits", "aborts", "schema_calls", "seconds", "parse_seconds",
+                 "prompt_tokens", "completion_tokens", "cached_tokens", "failures",
+                 "latencies", "buckets")
+
+    def __init__(self):
+        self.actions = self.calls = self.retries = self.cache_hits = self.aborts = self.schema_calls = 0
+        self.seconds = self.parse_seconds = 0.0
+        self.prompt_tokens = self.completion_tokens = self.cached_tokens = 0
+        self.failures = Counter()          # reason -> count
+        self.latencies = []                # per model call, for percentiles
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def add_call(self, call: dict):
+        if call["cache_hit"]:
+            self.cache_hits += 1
+            return
+        self.calls += 1
+        self.seconds += call["seconds"]
+        self.parse_seconds += call["parse_seconds"]
+        self.prompt_tokens += call["prompt_tokens"]
+        self.completion_tokens += call["completion_tokens"]
+        self.cached_tokens += call["cached_tokens"]
+        self.aborts += call["aborted"]
+        self.schema_calls += call["schema"]
+        self.latencies.append(call["seconds"])
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if call["seconds"] <= bound:
+                self.buckets[i] += 1
+        if call["error"]:
+            self.failures[call["error"]] += 1
+
+
+class Metrics:
+    """
+    Aggregates per-call model metrics per game and player.
+
+    The game loop reports each action with observe(); summary() gives the
+    end-of-game text, to_prometheus() the Prometheus text exposition
+    (totals per player across games). If `path` is set, flush() writes it
+    there atomically (textfile-collector style); serve(port) exposes it
+    over HTTP at /metrics.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.games = defaultdict(lambda: defaultdict(PlayerStats))
+        self.totals = defaultdict(PlayerStats)
+        self.server = None
+
+    def observe(self, game: str, player: str, calls: list, failure: str = None):
+        """Record one take_turn: its per-attempt `calls`, and why it failed, if it did."""
+        with self.lock:
+            for stats in (self.games[game][player], self.totals[player]):
+                stats.actions += 1
+                stats.retries += retries(calls)
+                for call in calls:
+                    stats.add_call(call)
+                if failure:
+                    stats.failures[failure] += 1
+
+    def summary(self, game: str) -> str:
+        with self.lock:
+            players = self.games.get(game, {})
+            lines = []
+            for name, s in sorted(players.items()):
+                ordered = sorted(s.latencies)
+                p50 = ordered[len(ordered) // 2] if ordered else 0.0
+                failures = ", ".join(f"{k}={v}" for k, v in s.failures.items()) or "none"
+                lines.append(
+                    f"{name}: {s.actions} actions, {s.calls} calls ({s.retries} retries, "
+                    f"{s.cache_hits} cache hits, {s.aborts} streams cut short), {s.seconds:.1f}s in model calls (p50 {p50:.2f}s), "
+                    f"parse {1000 * s.parse_seconds:.1f}ms, tokens {s.prompt_tokens} in / "
+                    f"{s.completion_tokens} out / {s.cached_tokens} cached, failures: {failures}"
+                )
+            return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        out = []
+
+        def metric(name, kind, help_text, samples):
+            out.append(f"# HELP ptcgai_{name} {help_text}")
+            out.append(f"# TYPE ptcgai_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                out.append(f"ptcgai_{name}{{{label_text}}} {value}")
+
+        with self.lock:
+            totals = sorted(self.totals.items())
+            metric("actions_total", "counter", "take_turn calls",
+                   [({"player": p}, s.actions) for p, s in totals])
+            metric("model_calls_total", "counter", "Model API calls, including retries",
+                   [({"player": p}, s.calls) for p, s in totals])
+            metric("retries_total", "counter", "Extra model calls caused by invalid replies",
+                   [({"player": p}, s.retries) for p, s in totals])
+            metric("cache_hits_total", "counter", "Replies served from the response cache",
+                   [({"player": p}, s.cache_hits) for p, s in totals])
+            metric("schema_calls_total", "counter", "Model calls with a schema-constrained reply",
+                   [({"player": p}, s.schema_calls) for p, s in totals])
+            metric("stream_aborts_total", "counter", "Streamed replies cut short as invalid",
+                   [({"player": p}, s.aborts) for p, s in totals])
+            metric("failures_total", "counter", "Invalid replies and failed actions by reason",
+                   [({"player": p, "reason": r}, n) for p, s in totals for r, n in sorted(s.failures.items())])
+            metric("tokens_total", "counter", "Tokens by kind",
+                   [({"player": p, "kind": k}, getattr(s, f"{k}_tokens"))
+                    for p, s in totals for k in ("prompt", "completion", "cached")])
+            metric("json_parse_seconds_total", "counter", "Time spent parsing replies",
+                   [({"player": p}, round(s.parse_seconds, 6)) for p, s in totals])
+
+            out.append("# HELP ptcgai_model_call_seconds Model call wall time")
+            out.append("# TYPE ptcgai_model_call_seconds histogram")
+            for p, s in totals:
+                for bound, count in zip(LATENCY_BUCKETS, s.buckets):
+                    out.append(f'ptcgai_model_call_seconds_bucket{{player="{p}",le="{bound}"}} {count}')
+                out.append(f'ptcgai_model_call_seconds_bucket{{player="{p}",le="+Inf"}} {s.calls}')
+                out.append(f'ptcgai_model_call_seconds_sum{{player="{p}"}} {round(s.seconds, 6)}')
+                out.append(f'ptcgai_model_call_seconds_count{{player="{p}"}} {s.calls}')
+        return "\n".join(out) + "\n"
+
+    def flush(self):
+        """Write the Prometheus text file, if a path was given."""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, self.path)
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """Expose /metrics over HTTP from a background thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                blob = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200 if self.path == "/metrics" else 404)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(blob)))
+                self.end_headers()
+                self.wfile.write(blob)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+
+
+def add_metrics_args(parser):
+    parser.add_argument("--metrics-file", default=None, help="write Prometheus text metrics here")
+    parser.add_argument("--metrics-port", type=int, default=None, help="serve Prometheus metrics on this port")
+
+
+def make_metrics(args) -> Metrics:
+    metrics = Metrics(args.metrics_file)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    return metrics
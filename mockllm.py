@@ -0,0 +1,352 @@
+# mockllm.py
+
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockSettings:
+    """
+    Behaviour of the mock model.
+    latency:     fixed seconds before the first token
+    jitter:      extra uniform random latency, 0..jitter seconds
+    token_rate:  completion tokens generated per second (0 = instant)
+    malformed:   fraction of replies that are truncated, invalid JSON
+    fenced:      fraction of replies wrapped in ```json fences
+    missing_key: fraction of replies without "public_info"
+    prose:       fraction of replies with chatty text before the JSON object
+    end_every:   every n-th reply of a player sets end_turn
+    structured:  whether json_schema response_format is supported (else HTTP 400);
+                 schema-constrained replies are always valid
+    rpm:         requests per minute before HTTP 429 with Retry-After (0 = no limit)
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, token_rate=0.0, malformed=0.0,
+                 fenced=0.0, missing_key=0.0, end_every=3, seed=0, prose=0.0, structured=True,
+                 rpm=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_rate = token_rate
+        self.malformed = malformed
+        self.fenced = fenced
+        self.missing_key = missing_key
+        self.end_every = end_every
+        self.seed = seed
+        self.prose = prose
+        self.structured = structured
+        self.rpm = rpm
+
+
+class MockStats:
+    """Server-side counters, read by the benchmark."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prompt_bytes = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.bad_replies = 0
+        self.cancelled = 0           # replies the client hung up on before the end
+        self.prevented = 0           # bad replies not sent because a schema was requested
+        self.rate_limited = 0        # requests refused with 429
+        self.recent = collections.deque()    # arrival times within the last minute, for rpm
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {k: v for k, v in vars(self).items() if k not in ("lock", "recent")}
+
+
+# decisions of the last action of a turn, the first, and any in between
+MOVES = ("attack with the Active Pokémon.", "attach an Energy to the Active Pokémon.", "pass.")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+class MockLLM:
+    """Generates fake but well-formed (or deliberately broken) PTCG replies."""
+
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self.rng = random.Random(settings.seed)
+        self.lock = threading.Lock()
+        self.replies = 0
+
+    def take_number(self) -> int:
+        with self.lock:
+            self.replies += 1
+            return self.replies
+
+    def reply(self, messages: list, schema: dict = None, n: int = None):
+        """
+        Return (reply text, seconds before the first token, whether the reply is bad,
+        whether a bad reply was prevented). With a json `schema` the reply has
+        exactly its properties and is never bad. Choices of one request share
+        the reply number `n` (the same move) but roll their own damage and defects.
+        """
+        s = self.settings
+        if n is None:
+            n = self.take_number()
+        with self.lock:
+            roll = self.rng.random()
+            fence = self.rng.random() < s.fenced
+            delay = s.latency + self.rng.uniform(0, s.jitter)
+            damage = self.rng.choice((10, 30, 60, 90))
+
+        move = n % s.end_every if n % s.end_every < 2 else 2
+        # typed-board actions: the first action of a turn puts a Pokémon in play, the last attacks
+        actions = ([{"type": "attack", "name": "Mock Attack", "damage": damage}] if move == 0 else
+                   [{"type": "play", "card": "Mock Pokémon", "hp": 100, "to": "active"}] if move == 1 else [])
+        data = {
+            "memory": f"Hand: Shinx, Great Ball. Active: Shinx (60 HP). Action {n}.",
+            "decisions": f"Mock action {n}: " + MOVES[move],
+            "public_info": {
+                "Player1": {"Active": "Shinx", "Bench": "Blitzle", "Prize Cards remaining": 4},
+                "Player2": {"Active": "Vulpix", "Bench": "Larvesta", "Prize Cards remaining": 4},
+            },
+            "actions": actions,
+            "memory_ops": [{"op": "set", "key": "plan", "value": f"action {n}"}],
+            "end_turn": n % s.end_every == 0,
+        }
+        if schema is not None:
+            prevented = roll < s.missing_key + s.malformed + s.prose
+            data["public_info"] = json.dumps(data["public_info"])
+            data = {key: data.get(key) for key in schema["properties"]}
+            return json.dumps(data, ensure_ascii=False), delay, False, prevented
+
+        bad = False
+        if roll < s.missing_key:
+            del data["public_info"]
+            bad = True
+        text = json.dumps(data, ensure_ascii=False)
+        if s.missing_key <= roll < s.missing_key + s.malformed:
+            text = text[: len(text) // 2]
+            bad = True
+        if s.missing_key + s.malformed <= roll < s.missing_key + s.malformed + s.prose:
+            text = "Sure! Here is my move for this turn, as requested:\n" + text
+            bad = True
+        if fence:
+            text = f"```json\n{text}\n```"
+        return text, delay, bad, False
+
+
+def make_handler(llm: MockLLM, stats: MockStats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+            if llm.settings.rpm:
+                now = time.monotonic()
+                with stats.lock:
+                    while stats.recent and now - stats.recent[0] >= 60:
+                        stats.recent.popleft()
+                    limited = len(stats.recent) >= llm.settings.rpm
+                    if limited:
+                        stats.rate_limited += 1
+                        retry_after = 60 - (now - stats.recent[0])
+                    else:
+                        stats.recent.append(now)
+                if limited:
+                    self._send(429, {"error": {"message": "Rate limit reached for requests",
+                                               "type": "requests", "code": "rate_limit_exceeded"}},
+                               {"Retry-After": f"{retry_after:.2f}"})
+                    return
+
+            messages = body.get("messages", [])
+            prompt = "".join(str(m.get("content", "")) for m in messages)
+            schema = None
+            response_format = body.get("response_format") or {}
+            if response_format.get("type") == "json_schema":
+                if not llm.settings.structured:
+                    self._send(400, {"error": {"message": "response_format json_schema is not supported",
+                                               "type": "invalid_request_error"}})
+                    return
+                schema = response_format["json_schema"]["schema"]
+            # n > 1 asks for several candidate replies to the same prompt
+            number = llm.take_number()
+            choices = [llm.reply(messages, schema, number) for _ in range(max(1, int(body.get("n") or 1)))]
+            text, delay, bad, prevented = choices[0]
+            texts = [c[0] for c in choices]
+            time.sleep(delay)
+
+            prompt_tokens = estimate_tokens(prompt)
+            completion_tokens = sum(estimate_tokens(t) for t in texts)
+            with stats.lock:
+                stats.requests += 1
+                stats.prompt_bytes += len(prompt.encode("utf-8"))
+                stats.prompt_tokens += prompt_tokens
+                stats.bad_replies += sum(int(c[2]) for c in choices)
+                stats.prevented += sum(int(c[3]) for c in choices)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            }
+            if body.get("stream"):
+                include_usage = (body.get("stream_options") or {}).get("include_usage")
+                self._stream(body, text, usage if include_usage else None)
+                return
+
+            if llm.settings.token_rate:
+                time.sleep(completion_tokens / llm.settings.token_rate)
+            with stats.lock:
+                stats.completion_tokens += completion_tokens
+            self._send(200, {
+                "id": f"mock-{stats.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{
+                    "index": i,
+                    "message": {"role": "assistant", "content": t},
+                    "finish_reason": "stop",
+                } for i, t in enumerate(texts)],
+                "usage": usage,
+            })
+
+        def _stream(self, body: dict, text: str, usage):
+            # server-sent events over chunked encoding, ~4 tokens per event
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            base = {"id": f"mock-{stats.requests}", "object": "chat.completion.chunk",
+                    "created": int(time.time()), "model": body.get("model", "mock")}
+            step = 16
+            sent = 0
+            try:
+                for i in range(0, len(text), step):
+                    piece = text[i:i + step]
+                    if llm.settings.token_rate:
+                        time.sleep(estimate_tokens(piece) / llm.settings.token_rate)
+                    self._event({**base, "choices": [
+                        {"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+                    sent += estimate_tokens(piece)
+                self._event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                if usage:
+                    self._event({**base, "choices": [], "usage": usage})
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+                with stats.lock:
+                    stats.cancelled += 1
+            finally:
+                with stats.lock:
+                    stats.completion_tokens += sent
+
+        def _event(self, payload: dict):
+            self._chunk(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+
+        def _chunk(self, blob: bytes):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(blob), blob))
+            self.wfile.flush()
+
+        def _send(self, status: int, payload: dict, headers: dict = None):
+            blob = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(blob)))
+            self.end_headers()
+            try:
+                self.wfile.write(blob)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+                with stats.lock:
+                    stats.cancelled += 1
+
+    return Handler
+
+
+class MockServer:
+    """
+    OpenAI-compatible chat-completions stand-in on localhost.
+
+        with MockServer(MockSettings(malformed=0.1)) as server:
+            client = openai.AsyncOpenAI(api_key="mock", base_url=server.base_url)
+    """
+
+    def __init__(self, settings: MockSettings = None, host="127.0.0.1", port=0):
+        self.settings = settings or MockSettings()
+        self.stats = MockStats()
+        self.llm = MockLLM(self.settings)
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.llm, self.stats))
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mockllm", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_mock_args(parser):
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--token-rate", type=float, default=0.0, help="completion tokens/sec, 0 = instant")
+    parser.add_argument("--malformed", type=float, default=0.0, help="fraction of invalid JSON replies")
+    parser.add_argument("--fenced", type=float, default=0.0, help="fraction of ```-fenced replies")
+    parser.add_argument("--missing-key", type=float, default=0.0, help="fraction of replies missing public_info")
+    parser.add_argument("--prose", type=float, default=0.0, help="fraction of replies with text before the JSON")
+    parser.add_argument("--no-structured", dest="structured", action="store_false",
+                        help="reject json_schema response_format with HTTP 400")
+    parser.add_argument("--mock-rpm", type=int, default=0, help="requests per minute before HTTP 429 (0 = no limit)")
+    parser.add_argument("--mock-seed", type=int, default=0)
+
+
+def settings_from_args(args) -> MockSettings:
+    return MockSettings(args.latency, args.jitter, args.token_rate, args.malformed,
+                        args.fenced, args.missing_key, seed=args.mock_seed, prose=args.prose,
+                        structured=args.structured, rpm=args.mock_rpm)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock model server")
+    parser.add_argument("--port", type=int, default=8765)
+    add_mock_args(parser)
+    args = parser.parse_args()
+
+    server = MockServer(settings_from_args(args), port=args.port)
+    print(f"Mock LLM listening on {server.base_url} (set OPENAI_BASE_URL to use it)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
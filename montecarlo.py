@@ -0,0 +1,121 @@
+# montecarlo.py
+
+import argparse
+import time
+from config import DECKS
+from deck import parse_counts
+from catalog import load_catalog
+
+try:
+    import numpy as np
+except ImportError:       # optional: only this module needs NumPy
+    np = None
+
+
+def shuffled_decks(ids, n: int, rng):
+    """`n` independent shuffles of the card-id vector `ids`, one per row."""
+    decks = np.tile(ids, (n, 1))
+    return rng.permuted(decks, axis=1, out=decks)
+
+
+def opening_stats(counts: dict, targets: dict, n: int = 1_000_000, seed: int = 0,
+                  hand_size: int = 7, prizes: int = 4, turns: int = 5,
+                  basics=None, batch: int = 250_000) -> dict:
+    """
+    Monte Carlo opening-hand and draw statistics over `n` seeded shuffles.
+
+    `counts` maps card name -> copies (deck.parse_counts); `targets` maps a
+    label to the card names it counts, e.g. {"Shinx": ["Shinx"]}. With
+    `basics`, hands without a Basic Pokémon are mulligans: the other stats
+    are conditioned on a legal hand, which is what a redeal gives.
+
+    Returns {"mulligan": p, label: {"opening": p, "by_turn": [p, ...],
+    "prized_any": p, "prized_all": p}} where by_turn[t] is the chance of
+    having seen one by the draw of turn t + 1.
+    """
+    if np is None:
+        raise RuntimeError("montecarlo.py needs NumPy (pip install numpy)")
+    names = sorted(counts)
+    index = {name: i for i, name in enumerate(names)}
+    ids = np.repeat(np.arange(len(names), dtype=np.int16), [counts[name] for name in names])
+    if hand_size + prizes + turns > len(ids):
+        raise ValueError("deck too small for the hand, prizes and turns asked for")
+
+    def lookup(cards):
+        table = np.zeros(len(names), dtype=bool)
+        table[[index[c] for c in cards if c in index]] = True
+        return table
+
+    tables = {label: lookup(cards) for label, cards in targets.items()}
+    basic_table = lookup(basics) if basics else None
+    rng = np.random.default_rng(seed)
+
+    legal = 0
+    totals = {label: {"opening": 0, "by_turn": np.zeros(turns), "prized_any": 0, "prized_all": 0}
+              for label in targets}
+    draws = slice(hand_size + prizes, hand_size + prizes + turns)
+    prized = slice(hand_size, hand_size + prizes)
+    done = 0
+    while done < n:
+        size = min(batch, n - done)
+        done += size
+        decks = shuffled_decks(ids, size, rng)
+        keep = basic_table[decks[:, :hand_size]].any(axis=1) if basic_table is not None else slice(None)
+        decks = decks[keep]
+        legal += len(decks)
+        for label, table in tables.items():
+            hit = table[decks]
+            opening = hit[:, :hand_size].any(axis=1)
+            seen = np.logical_or.accumulate(hit[:, draws], axis=1) | opening[:, None]
+            in_prizes = hit[:, prized].sum(axis=1)
+            t = totals[label]
+            t["opening"] += opening.sum()
+            t["by_turn"] += seen.sum(axis=0)
+            t["prized_any"] += (in_prizes > 0).sum()
+            t["prized_all"] += (in_prizes == table[ids].sum()).sum()
+
+    result = {"mulligan": 1 - legal / n}
+    for label, t in totals.items():
+        result[label] = {
+            "opening": t["opening"] / legal,
+            "by_turn": list(t["by_turn"] / legal),
+            "prized_any": t["prized_any"] / legal,
+            "prized_all": t["prized_all"] / legal,
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Opening-hand and draw probabilities by Monte Carlo")
+    parser.add_argument("--player", default="Player1", choices=sorted(DECKS))
+    parser.add_argument("--card", nargs="+", default=None, help="cards to report (default: every card)")
+    parser.add_argument("--basic", nargs="+", default=None,
+                        help="Basic Pokémon (default: from the card catalog); hands without one are redealt")
+    parser.add_argument("--n", type=int, default=1_000_000, help="number of shuffles")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prizes", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    counts = parse_counts(DECKS[args.player])
+    targets = {card: [card] for card in (args.card or sorted(counts))}
+    basics = args.basic or [name for name in counts if load_catalog().is_basic(name)]
+    started = time.monotonic()
+    stats = opening_stats(counts, targets, args.n, args.seed, prizes=args.prizes,
+                          turns=args.turns, basics=basics)
+    elapsed = time.monotonic() - started
+
+    print(f"{args.player}: {args.n:,} shuffles in {elapsed:.1f}s")
+    if basics:
+        print(f"P(Basic in opening hand) {1 - stats['mulligan']:.4f}, "
+              f"mulligan {stats['mulligan']:.4f}; the rows below are for legal hands")
+    turn_columns = "  ".join(f"{'T' + str(t + 1):>6}" for t in range(args.turns))
+    print(f"{'card':<22}{'opening':>8}  {turn_columns}  {'prized':>7}  {'all prized':>10}")
+    for label in targets:
+        s = stats[label]
+        by_turn = "  ".join(f"{p:>6.3f}" for p in s["by_turn"])
+        print(f"{label:<22}{s['opening']:>8.3f}  {by_turn}  {s['prized_any']:>7.3f}  {s['prized_all']:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
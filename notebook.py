@@ -0,0 +1,89 @@
+# notebook.py
+
+import re
+
+# edit operations the model may send in "memory_ops"
+MEMORY_OPS_HELP = (
+    '{"op": "add", "cards": ["<card>", ...]}     cards that entered your hand\n'
+    '{"op": "remove", "cards": ["<card>", ...]}  cards that left your hand\n'
+    '{"op": "set", "key": "<field>", "value": "<text>"}  e.g. "plan", "active", "bench"\n'
+    '{"op": "unset", "key": "<field>"}\n'
+    '{"op": "note", "text": "<something to remember>"}'
+)
+
+HAND = re.compile(r"hand is:\s*(.+?)\.?\s*$", re.I | re.S)
+
+
+class Notebook:
+    """
+    Structured private memory edited by small operations instead of being
+    rewritten whole on every action. Holds the hand, named fields and the
+    most recent `max_notes` notes; render() is the text shown in prompts.
+    """
+
+    def __init__(self, hand=None, max_notes: int = 12):
+        self.hand = list(hand or [])
+        self.fields = {}
+        self.notes = []
+        self.max_notes = max_notes
+
+    @classmethod
+    def from_setup(cls, initial_setup: str, **kwargs) -> "Notebook":
+        """Start from the hand listed in an initial-setup string ("... hand is: A, B, C.")."""
+        m = HAND.search(initial_setup or "")
+        hand = [c.strip() for c in m.group(1).split(",") if c.strip()] if m else []
+        return cls(hand, **kwargs)
+
+    def add(self, cards):
+        self.hand.extend(str(c) for c in cards)
+
+    def remove(self, cards):
+        missing = []
+        for card in cards:
+            match = next((c for c in self.hand if c.lower() == str(card).lower()), None)
+            if match is None:
+                missing.append(str(card))
+            else:
+                self.hand.remove(match)
+        if missing:
+            raise ValueError(f"not in hand: {', '.join(missing)}")
+
+    def note(self, text: str):
+        self.notes.append(str(text))
+        del self.notes[:-self.max_notes]
+
+    def apply(self, op: dict):
+        if not isinstance(op, dict):
+            raise ValueError(f"memory op must be an object, got {op!r}")
+        kind = op.get("op")
+        try:
+            if kind == "add":
+                self.add(op["cards"])
+            elif kind == "remove":
+                self.remove(op["cards"])
+            elif kind == "set":
+                self.fields[str(op["key"])] = op["value"] if isinstance(op["value"], str) else str(op["value"])
+            elif kind == "unset":
+                self.fields.pop(str(op["key"]), None)
+            elif kind == "note":
+                self.note(op["text"])
+            else:
+                raise ValueError(f"unknown memory op {kind!r}")
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"{kind} op is missing or has a bad field: {e}")
+
+    def apply_all(self, ops) -> list:
+        """Apply each op in order; returns an error message per rejected op."""
+        errors = []
+        for op in ops or []:
+            try:
+                self.apply(op)
+            except ValueError as e:
+                errors.append(f"Could not apply {op!r}: {e}")
+        return errors
+
+    def render(self) -> str:
+        lines = [f"Hand: {', '.join(self.hand) or 'empty'}"]
+        lines += [f"{key}: {value}" for key, value in self.fields.items()]
+        lines += [f"- {note}" for note in self.notes]
+        return "\n".join(lines)
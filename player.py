@@ -1,7 +1,93 @@
 # player.py
 
 import openai
+import asyncio
+import contextvars
 import json
+import time
+from cache import cache_lookup, cache_store
+from metrics import call_record, timed_parse
+from board import ACTION_HELP
+from notebook import Notebook, MEMORY_OPS_HELP
+from jsonstream import stream_completion
+from schema import response_format, drop_nulls
+from rules import RulesChecker
+import scorer
+
+# fields take_turn_async updates on the player (call records, best-of scores and the
+# schema / n-choices fallbacks), copied back from a speculative request by speculate.py
+REPLY_STATE = ("last_calls", "last_scores", "schema", "multi_choice")
+
+# one-shot inputs build_prompt shows once and then clears; main.py puts them
+# back when a reply is rejected so the corrected prompt still carries them
+PENDING = ("pending_draw", "pending_new_turn", "pending_user_input", "opponent_public_info")
+
+# {"player", "phase", "backend"} of the request being made, read by backends.RoutedClient
+ROUTE = contextvars.ContextVar("route", default=None)
+
+def strip_fences(s: str) -> str:
+    if s.startswith("```"):
+        lines = s.splitlines()
+        if lines[0].startswith("```"):
+            lines = lines[1:]
+        if lines and lines[-1].startswith("```"):
+            lines = lines[:-1]
+        return "\n".join(lines)
+    return s
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for budgeting and reports."""
+    return (len(text) + 3) // 4
+
+async def request_reply(player, client, messages: list, required, on_field=None):
+    """
+    One chat completion with `player`'s model settings; returns (response, reply text).
+    Streams when player.stream is set (see jsonstream.stream_completion). With
+    player.schema the reply is constrained to schema.response_format(required);
+    if the backend rejects that, schema mode is switched off for the player and
+    the request is sent again the usual way.
+    """
+    request = dict(model=player.model, messages=messages, temperature=player.temperature)
+    if player.schema:
+        request["response_format"] = response_format(required)
+    try:
+        if player.stream:
+            resp = await stream_completion(client, required, on_field, **request)
+            return resp, resp.text
+        resp = await client.chat.completions.create(**request)
+        return resp, resp.choices[0].message.content
+    except openai.BadRequestError:
+        if not player.schema:
+            raise
+        player.schema = False
+        return await request_reply(player, client, messages, required, on_field)
+
+async def request_candidates(player, client, messages: list, required, n: int):
+    """
+    `n` replies to the same request; returns (responses, reply texts, seconds
+    per response). Asks for `n` choices in one call (one response), or, once
+    the backend has rejected that, sends `n` calls in parallel (each through
+    request_reply, one response and timing per reply).
+    """
+    if player.multi_choice:
+        request = dict(model=player.model, messages=messages, temperature=player.temperature, n=n)
+        if player.schema:
+            request["response_format"] = response_format(required)
+        started = time.perf_counter()
+        try:
+            resp = await client.chat.completions.create(**request)
+            return [resp], [choice.message.content for choice in resp.choices], [time.perf_counter() - started]
+        except openai.BadRequestError:
+            player.multi_choice = False
+
+    async def timed():
+        started = time.perf_counter()
+        resp, raw = await request_reply(player, client, messages, required)
+        return resp, raw, time.perf_counter() - started
+
+    replies = await asyncio.gather(*(timed() for _ in range(n)))
+    return [r[0] for r in replies], [r[1] for r in replies], [r[2] for r in replies]
+
 
 class Player:
     def __init__(self, name: str, deck: str, order: str, initial_setup: str):
@@ -11,6 +97,14 @@ class Player:
         self.initial_setup = initial_setup
 
         self.max_retries = 3
+        self.model = "o3-mini"
+        self.temperature = 1
+        self.phase = "setup"          # setup / turn_start / continue, for backend routing
+        self.cache = None             # optional cache.ResponseCache
+        self.stream = False           # stream replies and abort bad ones early (async only)
+        self.schema = False           # structured-output replies (async only, see request_reply)
+        self.best_of = 1              # candidate replies per action, ranked by scorer (async only)
+        self.multi_choice = True      # the backend accepts n > 1 (see request_candidates)
 
         # dynamic state for prompt-building
         self.pending_draw = ""
@@ -23,136 +117,320 @@ class Player:
         # private memory
         self.memory = ""
 
-        self.system_prompt = (
+        # optional board.Board kept by the engine (see use_board) and
+        # notebook.Notebook edited with memory_ops (see use_memory_ops)
+        self.board = None
+        self.notebook = None
+        self.rules = None             # optional rules.RulesChecker (see use_rules)
+        self.public_log = None        # optional events.PublicLog (see use_public_log)
+        self.seen_version = 0         # last public_log version shown in an applied action
+        self.views_since_snapshot = 0
+        self.prompt_prefix = self._build_prefix()
+
+        # per-attempt metrics of the most recent take_turn (see metrics.call_record)
+        self.last_calls = []
+        self.last_scores = []         # scorer values of the last best-of-N candidates
+        self.last_prompt_sections = []
+
+    def _build_prefix(self) -> str:
+        # Static instructions. Together with the decklist and initial setup they form
+        # a prompt prefix that is byte-identical on every call, so provider-side
+        # prompt caching can reuse it; everything that changes goes after it.
+        if self.board is None:
+            board_key = (
+                "  • \"public_info\": \"<public game state for Player1 and Player2: each player's Active Pokémon & stats, Benched Pokémon & stats, and prize cards remaining>\"\n"
+            )
+            must_track = (
+                "  1. Your current hand (which cards you hold), removing any cards you used.\n"
+                "  2. Your Active Pokémon and its stats (HP, attached Energies, any Conditions).\n"
+                "  3. Your Benched Pokémon and their stats.\n"
+                "  4. The specific action you are taking this turn.\n\n"
+            )
+            board_help = ""
+        else:
+            board_key = "  • \"actions\": [<every public change you make this action, as objects listed below>]\n"
+            must_track = (
+                "  1. Your current hand (which cards you hold), removing any cards you used.\n"
+                "  2. The specific action you are taking this turn.\n"
+                "The board (Pokémon, HP, Energies, Conditions, prizes) is tracked for you and shown as [Board].\n\n"
+            )
+            board_help = f"Action objects:\n{ACTION_HELP}\n\n"
+        if self.public_log is not None:
+            must_track += (
+                "The public board is sent as [Board changes] since your last action, with a full "
+                "[Board state] every few actions; remember what you need of it.\n\n"
+            )
+
+        if self.notebook is None:
+            memory_key = "  • \"memory\": \"<the updated private memory>\"\n"
+            memory_intro = "Your \"memory\" field must at minimum summarize:\n"
+        else:
+            memory_key = "  • \"memory_ops\": [<edits to your private memory, as objects listed below; [] if nothing changed>]\n"
+            memory_intro = (
+                f"Memory ops (your turn draw is added to your hand for you):\n{MEMORY_OPS_HELP}\n\n"
+                "Only send what changed. Your memory must at minimum keep track of:\n"
+            )
+
+        instructions = (
             "You are simulating a game of the Pokémon Trading Card Game (PTCG) via text. "
             f"You are acting as {self.name}, not as a judge—you play like a real player.\n\n"
-            f"Initial game setup:\n{initial_setup}\n\n"
-            "# Decklist (for your reference; you must only use cards from your hand):\n"
-            f"{deck}\n\n"
-            f"You will play {order} as {self.name}.\n\n"
-            "When you respond, output exactly ONE JSON object with these keys:\n"
-            "  • \"memory\": \"<the updated private memory>\"\n"
-            "  • \"decisions\": \"<what you will do now>\"\n"
-            "  • \"public_info\": \"<public game state for Player1 and Player2: each player's Active Pokémon & stats, Benched Pokémon & stats, and prize cards remaining>\"\n"
-            "  • \"end_turn\": true or false; true if you are ending your turn, false to take another action\n"
-            "Optionally include:\n"
-            "  • \"to_memorize\": \"<any extra details you think are important to remember>\"\n"
-            "  • \"user_input_request\": \"<exactly what you need me to do>\"\n\n"
-            "Your \"memory\" field must at minimum summarize:\n"
-            "  1. Your current hand (which cards you hold), removing any cards you used.\n"
-            "  2. Your Active Pokémon and its stats (HP, attached Energies, any Conditions).\n"
-            "  3. Your Benched Pokémon and their stats.\n"
-            "  4. The specific action you are taking this turn.\n\n"
-            "You must only play cards that are currently in your hand—do not reference or use any other cards.\n\n"
-            "Now begin your move by selecting your Active Pokémon."
-        )
-
-        self.turn_instruction = (
-            "Continue simulating as " + self.name + ", not a judge.\n\n"
             "Decide what information is critical to the game state, then output exactly ONE JSON object with these keys:\n"
-            "  • \"memory\": \"<the updated private memory>\"\n"
+            f"{memory_key}"
             "  • \"decisions\": \"<what you will do now>\"\n"
-            "  • \"public_info\": \"<public game state for Player1 and Player2: each player's Active Pokémon & stats, Benched Pokémon & stats, and prize cards remaining>\"\n"
+            f"{board_key}"
             "  • \"end_turn\": true or false; true if you are ending your turn, false to take another action\n"
             "Optionally include:\n"
             "  • \"to_memorize\": \"<any extra details you think are important to remember>\"\n"
             "  • \"user_input_request\": \"<exactly what you need me to do>\"\n\n"
-            "Your \"memory\" field must at minimum summarize:\n"
-            "  1. Your current hand (removing cards you used).\n"
-            "  2. Your Active Pokémon and its stats (HP, attached Energies, any Conditions).\n"
-            "  3. Your Benched Pokémon and their stats.\n"
-            "  4. The specific action you are taking this turn.\n\n"
-            "You must only play cards that are currently in your hand—do not reference or use any other cards.\n\n"
-            "Then continue with your move."
+            f"{board_help}"
+            f"{memory_intro}"
+            f"{must_track}"
+            "You must only play cards that are currently in your hand—do not reference or use any other cards."
         )
+        return (
+            f"{instructions}\n\n"
+            "# Decklist (for your reference; you must only use cards from your hand):\n"
+            f"{self.deck.strip()}\n\n"
+            f"Initial game setup:\n{self.initial_setup}\n\n"
+            f"You will play {self.order} as {self.name}."
+        )
+
+    def use_board(self, board):
+        """
+        Switch to engine-kept board state: the model reports "actions"
+        instead of regenerating "public_info", and prompts show board.render().
+        """
+        self.board = board
+        self.prompt_prefix = self._build_prefix()
+
+    def use_memory_ops(self):
+        """
+        Switch to incremental memory: the model sends small "memory_ops"
+        edits to a notebook.Notebook (seeded with the opening hand) instead
+        of rewriting "memory" in full, so output size stays flat over a game.
+        """
+        self.notebook = Notebook.from_setup(self.initial_setup)
+        self.prompt_prefix = self._build_prefix()
+
+    def use_public_log(self, log):
+        """
+        Read the public board from a shared events.PublicLog: prompts show only
+        the changes since this player's last applied action, with a periodic
+        full snapshot, and the opponent's decisions since then as [Public info].
+        """
+        self.public_log = log
+        self.prompt_prefix = self._build_prefix()
+
+    def use_rules(self):
+        """Check each reply's decisions against the hand and board tracked by a rules.RulesChecker."""
+        self.rules = RulesChecker(self.deck, self.initial_setup)
+
+    @property
+    def required_keys(self) -> tuple:
+        return ("memory" if self.notebook is None else "memory_ops", "decisions", "end_turn",
+                "public_info" if self.board is None else "actions")
+
+    def remember(self, text: str):
+        """Add a line to private memory (a note, in memory-ops mode)."""
+        if self.notebook is not None:
+            self.notebook.note(text)
+            self.memory = self.notebook.render()
+        else:
+            self.memory += "\n" + text
+
+    def receive_draw(self, card: str):
+        """Note the card drawn at the start of a turn for the next prompt, the notebook and the rules checker."""
+        self.pending_draw = card
+        if self.notebook is not None:
+            self.notebook.add([card])
+        if self.rules is not None:
+            self.rules.new_turn(card)
 
     def build_prompt(self) -> str:
-        # 1) New-turn header
-        header = ""
+        # 1) Static prefix: instructions, decklist, initial setup
+        sections = [self.prompt_prefix]
+        self.phase = "setup" if not self.memory else "turn_start" if self.pending_new_turn else "continue"
+
+        # 2) New-turn header
         if self.pending_new_turn:
-            header = "[New Turn]\n\n"
+            sections.append("[New Turn]")
             self.pending_new_turn = False
 
-        # 2) Base prompt
-        deck_block = f"# Decklist (for reference):\n{self.deck}\n\n"
+        # 3) Private memory, or the opening instruction on the first call
         if not self.memory:
-            base = self.system_prompt
+            sections.append("Now begin your move by selecting your Active Pokémon.")
         else:
-            base = (
-                f"{self.turn_instruction}\n\n"
-                f"{deck_block}"
-                f"Previously remembered:\n{self.memory}"
-            )
-        prompt = header + base
+            sections.append(f"Previously remembered:\n{self.memory}\n\nThen continue with your move.")
 
-        # 3) Shared board state
-        if self.board_state:
-            prompt += f"\n\n[Board state: {json.dumps(self.board_state)}]"
+        # 4) Shared board state: changes since the last applied action, or all of it
+        if self.public_log is not None:
+            board, self.opponent_public_info = self.public_log.view(self)
+            if board:
+                sections.append(board)
+        elif self.board is not None:
+            sections.append(f"[Board:\n{self.board.render()}]")
+        elif self.board_state:
+            sections.append(f"[Board state: {json.dumps(self.board_state)}]")
 
-        # 4) Drawn card
+        # 5) Drawn card
         if self.pending_draw:
-            prompt += f"\n\n[Drawn card: {self.pending_draw}]"
+            sections.append(f"[Drawn card: {self.pending_draw}]")
             self.pending_draw = ""
 
-        # 5) Last decisions
+        # 6) Last decisions
         if self.last_decisions:
-            prompt += f"\n\n[Last decisions: {self.last_decisions}]"
+            sections.append(f"[Last decisions: {self.last_decisions}]")
 
-        # 6) Opponent’s public info
+        # 7) Opponent’s public info
         if self.opponent_public_info:
-            prompt += f"\n\n[Public info: {self.opponent_public_info}]"
+            sections.append(f"[Public info: {self.opponent_public_info}]")
             self.opponent_public_info = ""
 
-        # 7) All pending user notes + corrections
+        # 8) All pending user notes + corrections
         if self.pending_user_input:
-            prompt += f"\n\n[User note: {self.pending_user_input}]"
+            sections.append(f"[User note: {self.pending_user_input}]")
             self.pending_user_input = ""
 
-        return prompt
+        # kept so the logger can store the static sections once
+        self.last_prompt_sections = sections
+        return "\n\n".join(sections)
 
-    def take_turn(self, prompt: str) -> dict:
-        def strip_fences(s: str) -> str:
-            if s.startswith("```"):
-                lines = s.splitlines()
-                if lines[0].startswith("```"):
-                    lines = lines[1:]
-                if lines and lines[-1].startswith("```"):
-                    lines = lines[:-1]
-                return "\n".join(lines)
-            return s
+    def _parse_response(self, raw: str) -> dict:
+        """Strip code fences and validate the JSON reply; raises on bad output."""
+        data = json.loads(strip_fences(raw.strip()))
+        if self.schema:
+            data = drop_nulls(data)
+        if not all(k in data for k in self.required_keys):
+            raise KeyError(f"Missing one of ({', '.join(self.required_keys)})")
+        return data
+
+    def _retry_prompt(self, prompt: str) -> str:
+        return prompt + (
+            "\n\n⚠️ Your previous response was invalid. "
+            "Please reply with exactly one JSON object containing keys "
+            f"{', '.join(json.dumps(k) for k in self.required_keys)}, "
+            "and optionally \"to_memorize\", \"user_input_request\"."
+        )
+
+    def _give_up(self, last_error, last_content) -> ValueError:
+        return ValueError(
+            f"{self.name} failed to return valid JSON after {self.max_retries} attempts. "
+            f"Last error: {last_error}. Last raw response: {last_content!r}"
+        )
 
+    def take_turn(self, prompt: str) -> dict:
         last_error = None
         last_content = None
         current_prompt = prompt
+        self.last_calls = []
+
+        messages = [{"role": "user", "content": prompt}]
+        key, cached = cache_lookup(self.cache, self.model, self.temperature, messages)
+        if cached is not None:
+            self.last_calls.append(call_record(0, 0.0, cache_hit=True))
+            return self._parse_response(cached)
 
         for attempt in range(1, self.max_retries + 1):
+            started = time.perf_counter()
             resp = openai.chat.completions.create(
-                model="o3-mini",
+                model=self.model,
                 messages=[{"role": "user", "content": current_prompt}],
-                temperature=1
+                temperature=self.temperature
             )
             raw = resp.choices[0].message.content
-            clean = strip_fences(raw.strip())
             last_content = raw
+            call = call_record(attempt, time.perf_counter() - started, resp)
+            self.last_calls.append(call)
 
             try:
-                data = json.loads(clean)
-                if not all(k in data for k in ("memory","decisions","end_turn","public_info")):
-                    raise KeyError("Missing one of (memory, decisions, end_turn, public_info)")
+                data = timed_parse(call, self._parse_response, raw)
+                cache_store(self.cache, key, raw, self.model)
                 return data
+            except (json.JSONDecodeError, KeyError) as e:
+                last_error = e
+                if attempt < self.max_retries:
+                    current_prompt = self._retry_prompt(current_prompt)
+                    continue
+                raise self._give_up(last_error, last_content)
+
+    async def take_turn_async(self, prompt: str, client, on_field=None) -> dict:
+        """
+        Same as take_turn, but awaits the shared AsyncOpenAI `client`.
+        With self.stream, on_field(key, value) sees each reply field as soon
+        as it has streamed in, and a reply that can't be valid is cut short.
+        With self.best_of > 1, each attempt asks for that many candidates and
+        keeps the valid one the scorer ranks highest (see _best_candidate).
+        """
+        last_error = None
+        last_content = None
+        current_prompt = prompt
+        self.last_calls = []
+        self.last_scores = []
+        route = {"player": self.name, "phase": self.phase, "backend": None}
+        ROUTE.set(route)
+
+        messages = [{"role": "user", "content": prompt}]
+        key, cached = cache_lookup(self.cache, self.model, self.temperature, messages)
+        if cached is not None:
+            self.last_calls.append(call_record(0, 0.0, cache_hit=True))
+            return self._parse_response(cached)
 
+        for attempt in range(1, self.max_retries + 1):
+            started = time.perf_counter()
+            if self.best_of > 1:
+                resps, raws, seconds = await request_candidates(
+                    self, client, [{"role": "user", "content": current_prompt}], self.required_keys, self.best_of)
+                calls = [call_record(attempt, s, r, schema=self.schema, backend=route["backend"])
+                         for r, s in zip(resps, seconds)]
+                self.last_calls.extend(calls)
+                last_content = raws[-1]
+                try:
+                    raw, data = self._best_candidate(calls, raws)
+                    cache_store(self.cache, key, raw, self.model)
+                    return data
+                except (json.JSONDecodeError, KeyError) as e:
+                    last_error = e
+                    if attempt < self.max_retries:
+                        current_prompt = self._retry_prompt(current_prompt)
+                        route["phase"] = "retry"
+                        continue
+                    raise self._give_up(last_error, last_content)
+
+            resp, raw = await request_reply(self, client, [{"role": "user", "content": current_prompt}],
+                                            self.required_keys, on_field)
+            last_content = raw
+            call = call_record(attempt, time.perf_counter() - started, resp, schema=self.schema,
+                               backend=route["backend"])
+            self.last_calls.append(call)
+
+            try:
+                data = timed_parse(call, self._parse_response, raw)
+                cache_store(self.cache, key, raw, self.model)
+                return data
             except (json.JSONDecodeError, KeyError) as e:
                 last_error = e
                 if attempt < self.max_retries:
-                    current_prompt += (
-                        "\n\n⚠️ Your previous response was invalid. "
-                        "Please reply with exactly one JSON object containing keys "
-                        "\"memory\", \"decisions\", \"end_turn\", and \"public_info\", "
-                        "and optionally \"to_memorize\", \"user_input_request\"."
-                    )
+                    current_prompt = self._retry_prompt(current_prompt)
+                    route["phase"] = "retry"
                     continue
+                raise self._give_up(last_error, last_content)
 
-                raise ValueError(
-                    f"{self.name} failed to return valid JSON after {self.max_retries} attempts. "
-                    f"Last error: {last_error}. Last raw response: {last_content!r}"
-                )
+    def _best_candidate(self, calls: list, raws: list) -> tuple:
+        """
+        (raw, data) of the valid candidate reply that scorer.best() ranks highest;
+        raises the last validation error if none is valid. Parse time and errors
+        go to each reply's own call record, or to the one n-choices call.
+        """
+        candidates, error = [], None
+        for i, raw in enumerate(raws):
+            call = calls[i] if len(calls) == len(raws) else calls[0]
+            try:
+                candidates.append((raw, timed_parse(call, self._parse_response, raw)))
+            except (json.JSONDecodeError, KeyError) as e:
+                error = e
+        if not candidates:
+            raise error
+        if len(calls) == 1:
+            calls[0]["error"] = None         # the call returned at least one valid choice
+        index, self.last_scores = scorer.best(self, candidates)
+        return candidates[index]
@@ -1,6 +1,14 @@
 # player_no_mem.py
 
-import openai, json
+import openai, json, time
+from player import strip_fences, request_reply, ROUTE
+from schema import drop_nulls
+from cache import cache_lookup, cache_store
+from metrics import call_record, timed_parse
+from history import History
+
+REQUIRED_KEYS = ("decisions", "public_info", "end_turn")
+RETRY_MSG = "⚠️ Invalid JSON. Reply with keys: decisions, public_info, end_turn."
 
 class Player:
     def __init__(self, name, deck, order, initial_setup):
@@ -10,14 +18,20 @@ class Player:
         self.initial_setup = initial_setup
 
         self.max_retries = 3
+        self.model = "o3-mini"
+        self.temperature = 1
+        self.phase = "setup"          # setup / turn_start / continue, for backend routing
+        self.cache = None             # optional cache.ResponseCache
+        self.stream = False           # stream replies and abort bad ones early (async only)
+        self.schema = False           # structured-output replies (async only)
 
         # dynamic state
-        self.history = []
         self.pending_draw = ""
         self.pending_user_input = ""
         self.pending_new_turn = False
         self.last_decisions = ""
         self.board_state = {}
+        self.last_calls = []
 
         # seed system message
         self.system_prompt = (
@@ -34,11 +48,12 @@ class Player:
             " • \"to_memorize\"\n\n"
             "Begin."
         )
-        self.history.append({"role":"system","content":self.system_prompt})
+        self.history = History(self.system_prompt)   # token-budgeted chat history
         self.first = True
 
     def build_prompt(self):
         pieces = []
+        self.phase = "setup" if self.first else "turn_start" if self.pending_new_turn else "continue"
         if self.pending_new_turn:
             pieces.append("[New Turn]")
             self.pending_new_turn = False
@@ -65,49 +80,92 @@ class Player:
 
         user_msg = "\n\n".join(pieces).strip()
         # push to history
-        self.history.append({"role":"user","content":user_msg})
+        self.history.add_user(user_msg)
         return user_msg
 
+    def _parse_response(self, raw):
+        data = json.loads(strip_fences(raw.strip()))
+        if self.schema:
+            data = drop_nulls(data)
+        # must have keys
+        if not all(k in data for k in REQUIRED_KEYS):
+            raise KeyError("Missing keys")
+        # record assistant in history
+        self.history.add_assistant(raw)
+        return data
+
+    def _give_up(self, last_error, last_content):
+        return ValueError(
+            f"{self.name} failed after {self.max_retries} tries: {last_error}. "
+            f"Last content: {last_content!r}"
+        )
+
     def take_turn(self, user_msg):
-        # trim to system + last 10 messages
-        hist = self.history[-11:]
+        # system + rolling summary + the turns that fit the token budget
+        hist = self.history.messages()
         last_error = None
         last_content = None
+        self.last_calls = []
+
+        key, cached = cache_lookup(self.cache, self.model, self.temperature, hist)
+        if cached is not None:
+            self.last_calls.append(call_record(0, 0.0, cache_hit=True))
+            return self._parse_response(cached)
 
         for attempt in range(1, self.max_retries+1):
+            started = time.perf_counter()
             resp = openai.chat.completions.create(
-                model="o3-mini",
+                model=self.model,
                 messages=hist,
-                temperature=1
+                temperature=self.temperature
             )
             raw = resp.choices[0].message.content
             last_content = raw
-            # strip fences
-            clean = raw
-            if clean.startswith("```"):
-                lines = clean.splitlines()
-                if lines[0].startswith("```"): lines=lines[1:]
-                if lines[-1].startswith("```"): lines=lines[:-1]
-                clean = "\n".join(lines)
+            call = call_record(attempt, time.perf_counter() - started, resp)
+            self.last_calls.append(call)
 
             try:
-                data = json.loads(clean)
-                # must have keys
-                if not all(k in data for k in ("decisions","public_info","end_turn")):
-                    raise KeyError("Missing keys")
-                # record assistant in history
-                self.history.append({"role":"assistant","content":raw})
+                data = timed_parse(call, self._parse_response, raw)
+                cache_store(self.cache, key, raw, self.model)
                 return data
-
             except (json.JSONDecodeError, KeyError) as e:
                 last_error = e
                 if attempt < self.max_retries:
-                    hist.append({"role":"user","content":
-                        "⚠️ Invalid JSON. Reply with keys: decisions, public_info, end_turn."
-                    })
+                    hist.append({"role":"user","content":RETRY_MSG})
                     continue
+                raise self._give_up(last_error, last_content)
+
+    async def take_turn_async(self, user_msg, client, on_field=None):
+        # same as take_turn, awaiting the shared AsyncOpenAI client;
+        # with self.stream, on_field(key, value) sees fields as they stream in
+        hist = self.history.messages()
+        last_error = None
+        last_content = None
+        self.last_calls = []
+        route = {"player": self.name, "phase": self.phase, "backend": None}
+        ROUTE.set(route)
+
+        key, cached = cache_lookup(self.cache, self.model, self.temperature, hist)
+        if cached is not None:
+            self.last_calls.append(call_record(0, 0.0, cache_hit=True))
+            return self._parse_response(cached)
 
-                raise ValueError(
-                    f"{self.name} failed after {self.max_retries} tries: {last_error}. "
-                    f"Last content: {last_content!r}"
-                )
+        for attempt in range(1, self.max_retries+1):
+            started = time.perf_counter()
+            resp, raw = await request_reply(self, client, hist, REQUIRED_KEYS, on_field)
+            last_content = raw
+            call = call_record(attempt, time.perf_counter() - started, resp, schema=self.schema,
+                               backend=route["backend"])
+            self.last_calls.append(call)
+
+            try:
+                data = timed_parse(call, self._parse_response, raw)
+                cache_store(self.cache, key, raw, self.model)
+                return data
+            except (json.JSONDecodeError, KeyError) as e:
+                last_error = e
+                if attempt < self.max_retries:
+                    hist.append({"role":"user","content":RETRY_MSG})
+                    route["phase"] = "retry"
+                    continue
+                raise self._give_up(last_error, last_content)
@@ -0,0 +1,275 @@
+# ratelimit.py
+
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+import openai
+from player import estimate_tokens
+
+try:
+    import fcntl
+except ImportError:       # no flock (Windows): the limiter is per-process only
+    fcntl = None
+
+
+class Buckets:
+    """
+    Requests-per-minute and tokens-per-minute token buckets, refilled
+    continuously; 0 means no limit. With `path` the bucket levels and any
+    rate-limit pause live in a small JSON file under flock, so every process
+    using the same API key (tournament workers, parallel runs) draws from
+    one budget.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, path: str = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.path = path if fcntl is not None else None
+        self.state = self._full()
+
+    def _full(self) -> dict:
+        return {"requests": self.rpm, "tokens": self.tpm, "at": time.time(), "until": 0.0}
+
+    @contextmanager
+    def _locked(self):
+        if self.path is None:
+            yield self.state
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            text = f.read()
+            try:
+                state = json.loads(text) if text else self._full()
+            except json.JSONDecodeError:
+                state = self._full()
+            yield state
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state))
+
+    def _refill(self, state: dict, now: float):
+        elapsed = max(0.0, now - state["at"])
+        state["requests"] = min(self.rpm, state["requests"] + elapsed * self.rpm / 60)
+        state["tokens"] = min(self.tpm, state["tokens"] + elapsed * self.tpm / 60)
+        state["at"] = now
+
+    def take(self, tokens: int) -> float:
+        """Take one request and `tokens` if available and return 0, else the seconds to wait."""
+        tokens = min(tokens, self.tpm)          # a prompt bigger than the bucket goes once it is full
+        now = time.time()
+        with self._locked() as state:
+            self._refill(state, now)
+            waits = [state["until"] - now]
+            if self.rpm and state["requests"] < 1:
+                waits.append((1 - state["requests"]) * 60 / self.rpm)
+            if self.tpm and state["tokens"] < tokens:
+                waits.append((tokens - state["tokens"]) * 60 / self.tpm)
+            wait = max(waits)
+            if wait <= 0:
+                state["requests"] -= 1 if self.rpm else 0
+                state["tokens"] -= tokens if self.tpm else 0
+            return max(wait, 0.0)
+
+    def adjust(self, tokens: int):
+        """Charge (or refund, if negative) the difference between estimated and actual tokens."""
+        if self.tpm and tokens:
+            with self._locked() as state:
+                state["tokens"] = min(self.tpm, state["tokens"] - tokens)
+
+    def paused(self) -> float:
+        """Seconds left of the current rate-limit pause (0 if there is none)."""
+        with self._locked() as state:
+            return max(0.0, state["until"] - time.time())
+
+    def pause(self, seconds: float):
+        """Hold every caller, in every process sharing the file, for `seconds`."""
+        with self._locked() as state:
+            state["until"] = max(state["until"], time.time() + seconds)
+
+
+class RateLimiter:
+    """
+    Client-side limiter for one API key: callers queue in arrival order (so
+    concurrent games are served fairly), wait for room in the RPM/TPM
+    buckets, and run at most `concurrency` requests at a time. A 429 halves
+    the concurrency and pauses everyone for the server's Retry-After (or an
+    exponential backoff), with jitter, then the request is retried; after
+    `cooldown` seconds without one, each request that found the limit full
+    and didn't have to wait for the buckets raises it by one.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, path: str = None, concurrency: int = 8,
+                 max_concurrency: int = 64, max_retries: int = 6, base_delay: float = 1.0,
+                 completion_tokens: int = 1000, cooldown: float = 10.0):
+        self.buckets = Buckets(rpm, tpm, path)
+        self.limit = concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.completion_tokens = completion_tokens    # expected reply size, counted up front
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.last_throttled = 0.0
+        self.last_error = None            # the latest 429, re-raised to fail over during its pause
+        self.queue = None
+        self.slots = None
+        self.stats = {"requests": 0, "waits": 0, "wait_seconds": 0.0, "rate_limited": 0}
+
+    def estimate(self, body: dict) -> int:
+        prompt = sum(estimate_tokens(str(m.get("content", ""))) for m in body.get("messages", []))
+        return prompt + self.completion_tokens
+
+    async def _enter(self, tokens: int) -> bool:
+        if self.queue is None:          # created lazily, on the event loop that uses them
+            self.queue, self.slots = asyncio.Lock(), asyncio.Condition()
+        waited = False
+        async with self.queue:
+            async with self.slots:
+                await self.slots.wait_for(lambda: self.in_flight < self.limit)
+                self.in_flight += 1
+            while (wait := self.buckets.take(tokens)) > 0:
+                waited = True
+                self.stats["waits"] += 1
+                self.stats["wait_seconds"] += wait
+                await asyncio.sleep(wait)
+        return waited
+
+    async def _leave(self):
+        async with self.slots:
+            self.in_flight -= 1
+            self.slots.notify_all()
+
+    def _throttled(self, error, attempt: int):
+        self.stats["rate_limited"] += 1
+        self.last_throttled = time.monotonic()
+        self.last_error = error
+        self.limit = max(1, self.limit // 2)
+        retry_after = error.response.headers.get("retry-after") if error.response is not None else None
+        # jitter keeps the paused callers (and processes) from retrying in lockstep
+        try:
+            delay = float(retry_after) * random.uniform(1.0, 1.1)
+        except (TypeError, ValueError):
+            delay = self.base_delay * 2 ** attempt * random.uniform(0.5, 1.5)
+        self.buckets.pause(delay)
+
+    def _succeeded(self, resp, estimate: int, waited: bool, full: bool):
+        # resp is a completion, or a closed LimitedStream carrying the usage of its last chunk
+        usage = getattr(resp, "usage", None)
+        if usage is not None and usage.total_tokens:
+            self.buckets.adjust(usage.total_tokens - estimate)
+        if (full and not waited and self.limit < self.max_concurrency
+                and time.monotonic() - self.last_throttled > self.cooldown):
+            self.limit += 1
+
+    async def call(self, create, body: dict, max_retries: int = None):
+        """
+        `await create(**body)` within the limits, retrying on 429 up to
+        `max_retries` times (default self.max_retries; 0 lets the 429 through
+        once the pause is recorded). A streamed reply keeps its slot until the
+        stream is closed (see LimitedStream).
+        """
+        estimate = self.estimate(body)
+        retries = self.max_retries if max_retries is None else max_retries
+        if retries == 0 and self.last_error is not None and self.buckets.paused() > 0:
+            raise self.last_error       # fail over now rather than wait out the pause
+        for attempt in range(retries + 1):
+            waited = await self._enter(estimate)
+            full = self.in_flight >= self.limit
+            self.stats["requests"] += 1
+            try:
+                resp = await create(**body)
+            except openai.RateLimitError as e:
+                await self._leave()
+                self._throttled(e, attempt)
+                if attempt == retries:
+                    raise
+                continue
+            except BaseException:
+                await self._leave()
+                raise
+            if body.get("stream"):
+                return LimitedStream(resp, self, estimate, waited, full)
+            await self._leave()
+            self._succeeded(resp, estimate, waited, full)
+            return resp
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"rate limiter: {s['requests']} requests, {s['rate_limited']} rate-limited (429), "
+                f"{s['waits']} waits ({s['wait_seconds']:.1f}s), concurrency now {self.limit}")
+
+
+class LimitedStream:
+    """
+    A streamed reply that holds its limiter slot until it is closed, so
+    `concurrency` covers the whole stream, and then charges the token usage
+    reported in its last chunk (stream_options include_usage).
+    """
+
+    def __init__(self, stream, limiter: RateLimiter, estimate: int, waited: bool, full: bool):
+        self.stream = stream
+        self.limiter = limiter
+        self.estimate = estimate
+        self.waited = waited
+        self.full = full
+        self.usage = None
+        self.closed = False
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            if getattr(chunk, "usage", None) is not None:
+                self.usage = chunk.usage
+            yield chunk
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.stream.close()
+        finally:
+            await self.limiter._leave()
+            self.limiter._succeeded(self, self.estimate, self.waited, self.full)
+
+
+class LimitedClient:
+    """
+    Drop-in for the AsyncOpenAI client in the game loops (chat.completions.create)
+    that sends every request through `limiter`. The SDK's own retries are turned
+    off so the limiter sees each 429. With `failover` (set by backends.route_client)
+    a 429 is recorded and raised at once, so the router moves to another backend.
+    """
+
+    def __init__(self, client, limiter: RateLimiter):
+        self.client = client.with_options(max_retries=0) if hasattr(client, "with_options") else client
+        self.limiter = limiter
+        self.failover = False
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **body):
+        return await self.limiter.call(self.client.chat.completions.create, body,
+                                       max_retries=0 if self.failover else None)
+
+
+def add_rate_limit_args(parser):
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute allowed on the API key (0 = no limit)")
+    parser.add_argument("--tpm", type=int, default=0, help="tokens per minute allowed on the API key (0 = no limit)")
+    parser.add_argument("--rate-state", default="cache/ratelimit.json",
+                        help="file shared by every process limiting the same key ('' = this process only)")
+
+
+def make_limiter(args) -> RateLimiter:
+    """A RateLimiter from add_rate_limit_args() flags, or None when no limit is set."""
+    if not (args.rpm or args.tpm):
+        return None
+    return RateLimiter(args.rpm, args.tpm, args.rate_state or None)
+
+
+def limit_client(client, limiter: RateLimiter):
+    return LimitedClient(client, limiter) if limiter is not None else client
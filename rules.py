@@ -0,0 +1,178 @@
+# rules.py
+
+import copy
+import json
+import re
+from collections import Counter
+from notebook import HAND
+from catalog import load_catalog
+
+# a reply is re-asked at most this many times in a row before it is let through
+MAX_REJECTIONS = 2
+
+CLAUSE = re.compile(r"[.;\n]|,|\bthen\b|\band\b", re.I)
+EVOLVE = re.compile(r"\bevolv\w*", re.I)
+ATTACH = re.compile(r"\battach\w*", re.I)
+PLAY = re.compile(r"\b(?:play|bench|put|place)\w*", re.I)
+# verbs that name a card without necessarily taking it from the hand ("use Shinx to attack")
+USE = re.compile(r"\b(?:use|select|choose)\w*", re.I)
+# words after which the named cards are targets, not cards leaving the hand
+TARGET = re.compile(r"\b(?:to|onto|on|with|from|into|for|as)\b", re.I)
+# card effects that put cards we can't see into the hand
+HIDDEN_CARDS = re.compile(r"\b(?:search\w*|draw\w*|shuffle\w*|take|takes|into (?:my|your) hand)\b", re.I)
+
+
+def as_text(decisions) -> str:
+    """A reply's "decisions" as text: the model sometimes sends a list of steps or an object."""
+    if isinstance(decisions, str):
+        return decisions
+    if isinstance(decisions, list):
+        return " ".join(d if isinstance(d, str) else json.dumps(d, ensure_ascii=False) for d in decisions)
+    return json.dumps(decisions, ensure_ascii=False) if decisions is not None else ""
+
+
+def canonical(name: str) -> str:
+    """Case-folded card name; every basic Energy ("Basic L Energy", "Lightning Energy") is "energy"."""
+    name = " ".join(name.lower().split())
+    return "energy" if name.endswith("energy") else name
+
+
+class RulesChecker:
+    """
+    Tracks one player's hand and Pokémon in play from the decklist, the
+    initial setup and the draws, and checks the free-text "decisions" of
+    each reply against them: playing a card that isn't in hand, a second
+    manual Energy attachment in a turn, and evolving a Pokémon that isn't
+    in play. Once a card effect has put unseen cards into the hand, a card
+    only counts as missing when every copy in the deck has been used.
+    """
+
+    def __init__(self, deck: str, initial_setup: str):
+        # canonical card name -> copies, and -> category ("pokemon", "trainer" or "energy")
+        catalog = load_catalog()
+        self.deck, self.sections = Counter(), {}
+        for card_id, copies in catalog.parse_deck(deck).items():
+            card = catalog.by_id[card_id]
+            self.deck[canonical(card.name)] += copies
+            self.sections[canonical(card.name)] = card.category.lower()
+        self._derive()
+
+        m = HAND.search(initial_setup or "")
+        cards = m.group(1).split(",") if m else []
+        self.hand = Counter(canonical(c) for c in cards if c.strip())
+        self.in_play = []            # own Pokémon, canonical names
+        self.used = Counter()        # cards that have left the hand
+        self.uncertain = False       # the hand holds cards we haven't seen
+        self.attached = 0            # manual Energy attachments this turn
+
+    def _derive(self):
+        # lookups rebuilt from the decklist instead of being pickled or copied with the state
+        self.catalog = load_catalog()
+        names = sorted(self.deck, key=len, reverse=True)
+        self.pattern = re.compile(
+            r"(?<![\w'])(" + "|".join(re.escape(n) for n in names) + r")(?!\w)(?!'s)", re.I)
+
+    def __getstate__(self) -> dict:
+        return {k: v for k, v in vars(self).items() if k not in ("catalog", "pattern")}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._derive()
+
+    def new_turn(self, drawn: str):
+        self.attached = 0
+        self.hand[canonical(drawn)] += 1
+
+    def _cards(self, text: str) -> list:
+        return [canonical(m.group(1)) for m in self.pattern.finditer(text)]
+
+    def steps(self, decisions: str) -> list:
+        """
+        (kind, card, base) steps read from `decisions` (text, or a list or object
+        of steps), in order: ("play", card, None), ("use", card, None),
+        ("attach", "energy", None), ("evolve", evolution, base), and
+        ("hidden", None, None) after a clause that puts unseen cards into the hand.
+        """
+        steps = []
+        for clause in CLAUSE.split(as_text(decisions)):
+            evolve, attach = EVOLVE.search(clause), ATTACH.search(clause)
+            play, use = PLAY.search(clause), USE.search(clause)
+            if evolve:
+                rest = clause[evolve.end():]
+                into = re.search(r"\b(?:into|to)\b", rest, re.I)
+                if into:        # "evolve Shinx into Luxio"
+                    base, evolution = self._cards(rest[:into.start()]), self._cards(rest[into.end():])
+                else:           # "play Luxio to evolve Shinx"
+                    evolution, base = self._cards(clause[:evolve.start()]), self._cards(rest)
+                if base and evolution:
+                    steps.append(("evolve", evolution[-1], base[0]))
+            elif attach:
+                for card in self._cards(TARGET.split(clause[attach.end():], 1)[0]):
+                    steps.append(("attach" if card == "energy" else "play", card, None))
+            elif play or use:
+                verb = min((m for m in (play, use) if m), key=lambda m: m.start())
+                for card in self._cards(TARGET.split(clause[verb.end():], 1)[0]):
+                    steps.append(("play" if verb is play else "use", card, None))
+            if HIDDEN_CARDS.search(clause):
+                steps.append(("hidden", None, None))
+        return steps
+
+    def review(self, decisions: str, strict: bool = True) -> list:
+        """
+        Check `decisions` against the tracked state. Returns a message per
+        illegal step; the state is updated unless `strict` and there were any.
+        """
+        hand, in_play, used = self.hand.copy(), list(self.in_play), self.used.copy()
+        attached, uncertain = self.attached, self.uncertain
+        problems = []
+
+        def take(card):
+            if hand[card] > 0:
+                hand[card] -= 1
+            elif not uncertain or used[card] >= self.deck[card]:
+                problems.append(f"{self.display(card)} is not in your hand")
+            used[card] += 1
+
+        for kind, card, base in self.steps(decisions):
+            if kind == "hidden":
+                uncertain = True
+            elif kind == "attach":
+                attached += 1
+                if attached > 1:
+                    problems.append("only one Energy can be attached from your hand each turn")
+                take(card)
+            elif kind == "evolve":
+                take(card)
+                expected = self.catalog.evolves_from(card)
+                if expected and canonical(expected) != base:
+                    problems.append(f"{self.display(card)} evolves from {expected}, not {self.display(base)}")
+                elif base in in_play:
+                    in_play[in_play.index(base)] = card
+                else:
+                    problems.append(f"{self.display(base)} is not in play to evolve into {self.display(card)}")
+            elif card in in_play and (kind == "use" or hand[card] == 0):
+                continue        # a Pokémon in play named as the attacker, not played again
+            else:
+                take(card)
+                if self.sections.get(card) == "pokemon":
+                    in_play.append(card)
+
+        if problems and strict:
+            return problems
+        self.hand, self.in_play, self.used = hand, in_play, used
+        self.attached, self.uncertain = attached, uncertain
+        return problems
+
+    def check(self, decisions: str) -> list:
+        """The problems review() would report for `decisions`, leaving the tracked state as it is."""
+        return copy.deepcopy(self).review(decisions, strict=True)
+
+    def display(self, card: str) -> str:
+        return "Energy card" if card == "energy" else card.title()
+
+    def correction(self, problems: list) -> str:
+        """The note sent back with a rejected reply."""
+        hand = ", ".join(self.display(c) for c, n in sorted(self.hand.items()) for _ in range(n))
+        unseen = " plus cards from effects" if self.uncertain else ""
+        return (f"[Rules] Your last action was not applied: {'; '.join(problems)}. "
+                f"Your hand: {hand or 'empty'}{unseen}. Choose a legal action.")
@@ -0,0 +1,77 @@
+# schema.py
+
+# JSON schemas for structured-output replies. Strict mode needs every property
+# listed as required and no free-form objects, so optional fields are nullable
+# and null values are dropped again after parsing (drop_nulls).
+
+NULLABLE_STRING = {"type": ["string", "null"]}
+NULLABLE_INT = {"type": ["integer", "null"]}
+
+
+def _object(properties: dict) -> dict:
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+# one board.Board action; fields a given action type doesn't use are null
+ACTION = _object({
+    "type": {"type": "string", "enum": ["play", "evolve", "attach", "retreat", "attack", "damage",
+                                        "heal", "condition", "discard_energy", "promote"]},
+    "card": NULLABLE_STRING,
+    "hp": NULLABLE_INT,
+    "to": NULLABLE_STRING,
+    "target": NULLABLE_STRING,
+    "energy": NULLABLE_STRING,
+    "bench": NULLABLE_INT,
+    "discard_energy": NULLABLE_INT,
+    "name": NULLABLE_STRING,
+    "damage": NULLABLE_INT,
+    "side": {"type": ["string", "null"], "enum": ["self", "opponent", None]},
+    "amount": NULLABLE_INT,
+    "condition": NULLABLE_STRING,
+    "count": NULLABLE_INT,
+})
+
+# one notebook.Notebook memory op
+MEMORY_OP = _object({
+    "op": {"type": "string", "enum": ["add", "remove", "set", "unset", "note"]},
+    "cards": {"type": ["array", "null"], "items": {"type": "string"}},
+    "key": NULLABLE_STRING,
+    "value": NULLABLE_STRING,
+    "text": NULLABLE_STRING,
+})
+
+FIELDS = {
+    "memory": {"type": "string"},
+    "memory_ops": {"type": "array", "items": MEMORY_OP},
+    "decisions": {"type": "string"},
+    "public_info": {"type": "string"},
+    "actions": {"type": "array", "items": ACTION},
+    "end_turn": {"type": "boolean"},
+    "to_memorize": NULLABLE_STRING,
+    "user_input_request": NULLABLE_STRING,
+}
+
+OPTIONAL = ("to_memorize", "user_input_request")
+
+
+def response_format(required) -> dict:
+    """The response_format for a reply with the `required` keys plus the optional extras."""
+    properties = {key: FIELDS[key] for key in tuple(required) + OPTIONAL}
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "ptcg_reply", "strict": True, "schema": _object(properties)},
+    }
+
+
+def drop_nulls(value):
+    """Remove null fields (unused nullable properties) from a schema-shaped reply."""
+    if isinstance(value, dict):
+        return {k: drop_nulls(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [drop_nulls(v) for v in value]
+    return value
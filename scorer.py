@@ -0,0 +1,54 @@
+# scorer.py
+
+import copy
+from board import BoardError
+
+# score weights: a rejected step outweighs any gain, a prize card outweighs 300 damage
+ILLEGAL = -10.0
+PRIZE = 3.0
+DAMAGE = 0.01
+
+
+def board_outcome(board, player: str, actions) -> tuple:
+    """
+    (rejected actions, prize cards taken, net damage dealt) if `player`'s
+    `actions` were applied to a copy of the typed `board`.
+    """
+    trial = copy.deepcopy(board)
+    before = trial.sides[player].prizes
+    rejected, damage = 0, 0
+    for action in actions or []:
+        try:
+            trial.apply(player, action)
+        except (BoardError, ValueError):
+            rejected += 1
+            continue
+        kind = action.get("type")
+        if kind == "attack":
+            damage += int(action.get("damage", 0))
+        elif kind == "damage":
+            amount = int(action.get("amount", 0))
+            damage += amount if action.get("side") == "opponent" else -amount
+    return rejected, before - trial.sides[player].prizes, damage
+
+
+def score(player, data: dict) -> float:
+    """
+    Heuristic value of a valid reply for `player`: illegal decisions (rules
+    checker) and board actions that don't apply cost ILLEGAL each, and prize
+    cards taken and damage dealt on the typed board count in its favour.
+    Without a rules checker or typed board every reply scores 0.
+    """
+    value = 0.0
+    if player.rules is not None:
+        value += ILLEGAL * len(player.rules.check(data.get("decisions", "")))
+    if player.board is not None:
+        rejected, prizes, damage = board_outcome(player.board, player.name, data.get("actions"))
+        value += ILLEGAL * rejected + PRIZE * prizes + DAMAGE * damage
+    return value
+
+
+def best(player, candidates: list) -> tuple:
+    """(index, scores) of the highest-scoring (raw, data) candidate; ties go to the earliest."""
+    scores = [score(player, data) for _, data in candidates]
+    return max(range(len(scores)), key=lambda i: (scores[i], -i)), scores
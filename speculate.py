@@ -0,0 +1,64 @@
+# speculate.py
+
+import asyncio
+import copy
+from player import REPLY_STATE
+
+
+class Speculation:
+    """
+    The next request, fired while the operator is still deciding. It runs on
+    copies of the players advanced along the default path (no note, end turn
+    confirmed), so the real game state is untouched until it is adopted.
+    """
+
+    def __init__(self, index: int, prompt: str, player, task: asyncio.Task):
+        self.index = index            # player the prefetched prompt is for
+        self.prompt = prompt
+        self.player = player          # the copy that made the request
+        self.task = task
+
+    def matches(self, index: int, prompt: str) -> bool:
+        return index == self.index and prompt == self.prompt
+
+    def cancel(self):
+        self.task.cancel()
+        # a request that had already failed must not warn as an unretrieved exception
+        self.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def result(self, player) -> dict:
+        """The prefetched reply, with what the request changed on the copy (REPLY_STATE) moved onto `player`."""
+        try:
+            return await self.task
+        finally:
+            for field in REPLY_STATE:
+                setattr(player, field, getattr(self.player, field))
+
+
+def predict(players, index: int, end_turn: bool, driver):
+    """
+    (player index, prompt, player copy) for the request that follows if the
+    operator takes the default path, or None when it can't be known yet
+    (a new turn whose draw the driver can't peek at).
+    """
+    # the response cache is shared, not copied
+    shared = {id(p.cache): p.cache for p in players if p.cache is not None}
+    copies = copy.deepcopy(players, shared)
+    if end_turn:
+        index = (index + 1) % 2
+        card = driver.peek(copies[index]) if hasattr(driver, "peek") else None
+        if not card:
+            return None
+        copies[index].pending_new_turn = True
+        copies[index].receive_draw(card)
+    return index, copies[index].build_prompt(), copies[index]
+
+
+def start(players, index: int, end_turn: bool, driver, client):
+    """Fire the predicted next request in the background; None if there is nothing to predict."""
+    predicted = predict(players, index, end_turn, driver)
+    if predicted is None:
+        return None
+    index, prompt, player = predicted
+    task = asyncio.create_task(player.take_turn_async(prompt, client))
+    return Speculation(index, prompt, player, task)
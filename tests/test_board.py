@@ -0,0 +1,82 @@
+# tests/test_board.py
+
+import pytest
+from board import Board, BoardError
+
+
+def new_board():
+    board = Board.for_players(["Player1", "Player2"], prizes=4)
+    board.apply("Player1", {"type": "play", "card": "Shinx", "hp": 60, "to": "active"})
+    board.apply("Player2", {"type": "play", "card": "Vulpix", "hp": 60, "to": "active"})
+    return board
+
+
+def names(side):
+    return [p.name for p in side.bench]
+
+
+def test_play_evolve_attach_and_render():
+    board = new_board()
+    board.apply("Player1", {"type": "play", "card": "Pikachu", "hp": 70, "to": "active"})   # Active taken
+    board.apply("Player1", {"type": "evolve", "card": "Luxio", "hp": 90, "target": "active"})
+    board.apply("Player1", {"type": "attach", "energy": "Lightning Energy", "target": "bench:0"})
+    assert board.sides["Player1"].render() == "prizes 4 | Active: Luxio 90/90 | Bench: Pikachu 70/70 Lightning"
+
+
+def test_attack_knocks_out_and_takes_prizes():
+    board = new_board()
+    board.apply("Player2", {"type": "play", "card": "Charizard ex", "hp": 330})
+    board.apply("Player1", {"type": "attack", "name": "Tackle", "damage": 30})
+    assert board.sides["Player2"].active.damage == 30
+    board.apply("Player1", {"type": "attack", "name": "Tackle", "damage": 30})
+    assert board.sides["Player2"].active is None
+    assert board.sides["Player2"].discard == ["Vulpix"] and board.sides["Player1"].prizes == 3
+
+    board.apply("Player2", {"type": "promote", "bench": 0})
+    board.apply("Player1", {"type": "damage", "side": "opponent", "target": "active", "amount": 330})
+    assert board.sides["Player1"].prizes == 1 and board.winner() is None
+
+
+def test_heal_condition_and_discard_energy():
+    board = new_board()
+    board.apply("Player1", {"type": "attach", "energy": "Lightning"})
+    board.apply("Player1", {"type": "attach", "energy": "Lightning"})
+    board.apply("Player1", {"type": "damage", "side": "self", "target": "active", "amount": 40})
+    board.apply("Player1", {"type": "heal", "amount": 60})
+    board.apply("Player2", {"type": "condition", "side": "opponent", "condition": "Asleep"})
+    board.apply("Player1", {"type": "discard_energy", "count": 1})
+    active = board.sides["Player1"].active
+    assert (active.damage, active.energies, active.conditions) == (0, ["Lightning"], ["Asleep"])
+    board.apply("Player2", {"type": "condition", "side": "opponent", "condition": "none"})
+    assert active.conditions == []
+
+
+def test_bad_actions_are_rejected():
+    board = new_board()
+    errors = board.apply_all("Player1", [{"type": "promote", "bench": 0},
+                                         {"type": "retreat", "bench": 2},
+                                         {"type": "evolve", "card": "Luxio"},
+                                         {"type": "fly"}])
+    assert len(errors) == 4
+    for _ in range(5):
+        board.apply("Player1", {"type": "play", "card": "Shinx", "hp": 60})
+    with pytest.raises(BoardError, match="Bench is full"):
+        board.apply("Player1", {"type": "play", "card": "Shinx", "hp": 60})
+
+
+def test_duplicate_benched_pokemon_stay_distinct():
+    board = new_board()
+    side = board.sides["Player1"]
+    board.apply("Player1", {"type": "play", "card": "Pikachu", "hp": 70})
+    board.apply("Player1", {"type": "play", "card": "Pikachu", "hp": 70})   # equal to bench 0
+
+    board.apply("Player1", {"type": "retreat", "bench": 1})
+    assert side.active.name == "Pikachu" and names(side) == ["Pikachu", "Shinx"]
+    assert all(p is not side.active for p in side.bench)
+
+    board.apply("Player1", {"type": "play", "card": "Pikachu", "hp": 70})
+    board.apply("Player2", {"type": "attack", "name": "Ember", "damage": 70})
+    assert side.active is None and side.discard == ["Pikachu"]
+    board.apply("Player1", {"type": "promote", "bench": 2})
+    assert names(side) == ["Pikachu", "Shinx"]
+    assert all(p is not side.active for p in side.bench)
@@ -0,0 +1,61 @@
+# tests/test_cache.py
+
+import os
+import pytest
+from cache import CacheMiss, ResponseCache, cache_lookup, cache_store, make_cache
+
+MESSAGES = [{"role": "user", "content": "Your turn."}]
+
+
+def test_record_then_replay_serves_the_same_reply(tmp_path):
+    recorder = ResponseCache(str(tmp_path), "record")
+    key, raw = cache_lookup(recorder, "gpt-4o", 0.2, MESSAGES)
+    assert raw is None and recorder.misses == 1
+    cache_store(recorder, key, '{"action": "Attack"}', "gpt-4o")
+
+    replay = ResponseCache(str(tmp_path), "replay")      # a fresh process reads the files back
+    assert cache_lookup(replay, "gpt-4o", 0.2, MESSAGES) == (key, '{"action": "Attack"}')
+    assert replay.hits == 1
+
+
+def test_key_covers_model_temperature_and_messages():
+    key = ResponseCache.key("gpt-4o", MESSAGES, 0.2)
+    assert key == ResponseCache.key("gpt-4o", [dict(m) for m in MESSAGES], 0.2)
+    assert key != ResponseCache.key("gpt-4o-mini", MESSAGES, 0.2)
+    assert key != ResponseCache.key("gpt-4o", MESSAGES, 0.7)
+
+
+def test_replay_miss_raises_and_stores_nothing(tmp_path):
+    replay = ResponseCache(str(tmp_path), "replay")
+    with pytest.raises(CacheMiss):
+        replay.get(ResponseCache.key("gpt-4o", MESSAGES, 0.2))
+    replay.put("k", "reply")
+    assert os.listdir(tmp_path) == [] and replay.total_bytes == 0
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path), "record")
+    cache.put("a", "x" * 50)
+    cache.max_bytes = 2 * cache.index["a"] + 10         # room for two entries of this size
+    cache.put("b", "y" * 50)
+    assert cache.get("a") == "x" * 50                   # "a" is now the most recent
+    cache.put("c", "z" * 50)
+
+    assert list(cache.index) == ["a", "c"]
+    assert not os.path.exists(tmp_path / "b.json")
+    assert cache.total_bytes == sum(cache.index.values()) <= cache.max_bytes
+    assert cache.get("b") is None
+
+
+def test_unreadable_entry_counts_as_a_miss(tmp_path):
+    cache = ResponseCache(str(tmp_path), "record", hot_entries=0)
+    cache.put("a", "reply")
+    (tmp_path / "a.json").write_text("not json")
+    assert cache.get("a") is None
+    assert "a" not in cache.index and cache.total_bytes == 0
+
+
+def test_make_cache_off_is_none(tmp_path):
+    assert make_cache("off") is None
+    assert cache_lookup(None, "gpt-4o", 0.2, MESSAGES) == (None, None)
+    assert make_cache("replay", str(tmp_path), 1).max_bytes == 1024 * 1024
@@ -0,0 +1,37 @@
+# tests/test_catalog.py
+
+import pytest
+from catalog import Catalog, read_cards, DATA_PATH
+from deck import parse_counts
+
+DECK = """Pokemon - 8
+4 Shinx FST 91
+4 shinx XYZ 1
+Trainer - 4
+4 Great Ball SSH 164
+Energy - 18
+18 Lightning Energy 155"""
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return Catalog(read_cards(DATA_PATH))
+
+
+def test_decklist_parses_into_card_ids(catalog):
+    counts = catalog.parse_deck(DECK)
+    # set code and number first, else the name (case-insensitively)
+    assert counts == {"FST-91": 8, "SSH-164": 4, catalog.find("Lightning Energy").id: 18}
+    assert catalog.names(counts) == {"Shinx": 8, "Great Ball": 4, "Lightning Energy": 18}
+    assert parse_counts(DECK) == catalog.names(counts)
+
+
+def test_unknown_cards_are_named(catalog):
+    with pytest.raises(KeyError, match="Mewtwo, Mew"):
+        catalog.parse_deck("1 Mewtwo SV 5\n2 Mew SV 6\n4 Shinx FST 91")
+
+
+def test_lookups(catalog):
+    assert catalog.is_basic("shinx") and not catalog.is_basic("Luxio")
+    assert catalog.evolves_from("Luxray") == "Luxio"
+    assert catalog.find("Nobody") is None
@@ -0,0 +1,73 @@
+# tests/test_events.py
+
+from types import SimpleNamespace
+from events import PublicLog, flatten
+
+
+def viewer(name):
+    return SimpleNamespace(name=name, seen_version=0, views_since_snapshot=0)
+
+
+def board(p1_active, p2_active):
+    return {"Player1": {"Active": p1_active, "Prizes": 4}, "Player2": {"Active": p2_active, "Prizes": 4}}
+
+
+def test_flatten_paths_and_json_strings():
+    assert flatten(board("Shinx", "Vulpix")) == {"Player1 / Active": "Shinx", "Player1 / Prizes": "4",
+                                                 "Player2 / Active": "Vulpix", "Player2 / Prizes": "4"}
+    assert flatten('{"Player1": {"Active": "Shinx"}}') == {"Player1 / Active": "Shinx"}
+    assert flatten("free text") == {"public_info": "free text"}
+
+
+def test_first_view_is_a_snapshot_then_only_changes():
+    log, p1, p2 = PublicLog(snapshot_every=3), viewer("Player1"), viewer("Player2")
+    log.record_action("Player1", "Play Shinx")
+    log.record_board("Player1", board("Shinx", None))
+    log.seen(p1)
+
+    section, actions = log.view(p2)
+    assert section.startswith("[Board state v2:") and "Player1 / Active: Shinx" in section
+    assert actions == "Player1: Play Shinx"
+    log.seen(p2)
+
+    log.record_board("Player2", board("Shinx", "Vulpix"))
+    log.record_board("Player2", board("Luxio", "Vulpix"))
+    log.seen(p2)
+    section, actions = log.view(p1)
+    assert section == "[Board changes v2→v4:\nPlayer2 / Active: Vulpix\nPlayer1 / Active: Luxio]"
+    assert actions == ""
+
+
+def test_unchanged_board_is_not_logged():
+    log = PublicLog()
+    assert log.record_board("Player1", board("Shinx", "Vulpix"))
+    assert not log.record_board("Player2", board("Shinx", "Vulpix"))
+    assert log.version == 1
+
+
+def test_view_is_repeatable_until_seen():
+    log, p1 = PublicLog(), viewer("Player1")
+    log.record_board("Player2", board("Shinx", "Vulpix"))
+    assert log.view(p1) == log.view(p1)
+    log.seen(p1)
+    log.record_board("Player2", board("Shinx", "Larvesta"))
+    first = log.view(p1)
+    assert first == log.view(p1) and "Larvesta" in first[0]
+    assert p1.seen_version == 1
+
+
+def test_periodic_snapshot():
+    log, p1 = PublicLog(snapshot_every=2), viewer("Player1")
+    kinds = []
+    for i in range(6):
+        log.record_board("Player2", board("Shinx", f"Vulpix {i}"))
+        kinds.append(log.view(p1)[0].split()[1])
+        log.seen(p1)
+    assert kinds == ["state", "changes", "changes", "state", "changes", "changes"]
+
+
+def test_own_actions_are_not_echoed():
+    log, p1 = PublicLog(), viewer("Player1")
+    log.record_action("Player1", "Attack")
+    log.record_action("Player2", "Retreat")
+    assert log.view(p1)[1] == "Player2: Retreat"
@@ -0,0 +1,60 @@
+# tests/test_jsonstream.py
+
+import json
+import pytest
+from jsonstream import StreamParser, StreamError
+
+REPLY = {"memory": "Hand: Shinx", "decisions": "Play \"Shinx\" \\ bench {x}", "public_info": {"a": [1, {"b": "}"}]},
+         "end_turn": False}
+REQUIRED = ("memory", "decisions", "public_info", "end_turn")
+
+
+def feed_all(parser, text, size):
+    fields = []
+    for i in range(0, len(text), size):
+        fields += parser.feed(text[i:i + size])
+    return fields
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_fields_complete_in_order_for_any_chunking(size):
+    parser = StreamParser(REQUIRED)
+    fields = feed_all(parser, json.dumps(REPLY), size)
+    assert fields == list(REPLY.items())
+    assert parser.finish() == REPLY
+
+
+def test_escaped_quotes_and_braces_inside_strings():
+    parser = StreamParser()
+    parser.feed('{"decisions": "say \\"}\\" then \\\\", "n": 1}')
+    assert parser.finish() == {"decisions": 'say "}" then \\', "n": 1}
+
+
+def test_fenced_reply():
+    parser = StreamParser(("end_turn",))
+    feed_all(parser, "```json\n" + json.dumps({"end_turn": True}) + "\n```", 2)
+    assert parser.finish() == {"end_turn": True}
+
+
+def test_prose_before_the_object_aborts_at_once():
+    with pytest.raises(StreamError):
+        StreamParser().feed("Sure! Here is")
+
+
+def test_missing_required_key_aborts_when_the_object_closes():
+    parser = StreamParser(REQUIRED)
+    with pytest.raises(StreamError, match="public_info"):
+        parser.feed(json.dumps({"memory": "", "decisions": "", "end_turn": True}))
+
+
+def test_truncated_reply_fails_finish():
+    parser = StreamParser()
+    parser.feed('{"memory": "Hand')
+    with pytest.raises(StreamError):
+        parser.finish()
+
+
+def test_text_after_the_object_aborts():
+    parser = StreamParser()
+    with pytest.raises(StreamError):
+        parser.feed('{"a": 1} and more')
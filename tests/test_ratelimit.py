@@ -0,0 +1,79 @@
+# tests/test_ratelimit.py
+
+import pytest
+import ratelimit
+from ratelimit import Buckets
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture(params=["memory", "file"])
+def buckets(request, tmp_path, clock):
+    # the same arithmetic whether the levels live in the process or in a shared file
+    path = str(tmp_path / "limits.json") if request.param == "file" else None
+    return lambda rpm=0, tpm=0: Buckets(rpm, tpm, path)
+
+
+def test_requests_per_minute(buckets, clock):
+    b = buckets(rpm=60)                       # one request per second
+    assert [b.take(0) for _ in range(60)] == [0.0] * 60
+    assert b.take(0) == pytest.approx(1.0)    # empty: one second for the next request
+    clock[0] += 0.25
+    assert b.take(0) == pytest.approx(0.75)
+    clock[0] += 0.75
+    assert b.take(0) == 0.0
+
+
+def test_tokens_per_minute(buckets, clock):
+    b = buckets(tpm=6000)                     # 100 tokens per second
+    assert b.take(5000) == 0.0
+    assert b.take(2000) == pytest.approx(10.0)  # 1000 left, 1000 short
+    clock[0] += 4
+    assert b.take(2000) == pytest.approx(6.0)   # refilled to 1400
+    clock[0] += 6
+    assert b.take(2000) == 0.0 and b.take(1) > 0
+    assert b.take(0) == 0.0                   # a request with no tokens always fits
+
+
+def test_a_wait_takes_nothing(buckets):
+    b = buckets(rpm=1, tpm=1000)
+    assert b.take(800) == 0.0
+    assert b.take(100) == pytest.approx(60.0)   # out of requests, tokens would fit
+    assert b.take(100) == pytest.approx(60.0)   # the refused take left the 200 tokens
+    with b._locked() as state:
+        assert state["tokens"] == pytest.approx(200)
+
+
+def test_prompt_bigger_than_the_bucket_waits_for_a_full_one(buckets, clock):
+    b = buckets(tpm=600)
+    assert b.take(100) == 0.0
+    assert b.take(5000) == pytest.approx(10.0)  # capped at 600: waits for the 100 back
+    clock[0] += 10
+    assert b.take(5000) == 0.0
+
+
+def test_adjust_charges_and_refunds(buckets, clock):
+    b = buckets(tpm=6000)
+    assert b.take(3000) == 0.0
+    b.adjust(1000)                            # the reply used 1000 more than estimated
+    assert b.take(3000) == pytest.approx(10.0)
+    b.adjust(-2500)                           # refund of an over-estimate
+    assert b.take(3000) == 0.0
+    b.adjust(-100000)                         # refunds never overfill the bucket
+    with b._locked() as state:
+        assert state["tokens"] == 6000
+
+
+def test_unlimited_and_pause(buckets, clock):
+    b = buckets()
+    assert b.take(10 ** 9) == 0.0
+    b.adjust(10 ** 9)
+    b.pause(5)
+    assert b.paused() == pytest.approx(5) and b.take(0) == pytest.approx(5)
+    clock[0] += 5
+    assert b.paused() == 0.0 and b.take(0) == 0.0
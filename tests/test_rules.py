@@ -0,0 +1,66 @@
+# tests/test_rules.py
+
+import pytest
+from rules import RulesChecker
+
+DECK = """Pokemon - 11
+4 Blitzle VIV 53
+3 Luxio FST 92
+4 Shinx FST 91
+Trainer - 4
+4 Great Ball SSH 164
+Energy - 18
+18 Lightning Energy 155"""
+SETUP = "You have 4 prize cards. Your hand is: Shinx, Shinx, Blitzle, Great Ball, Basic L Energy."
+
+
+@pytest.fixture
+def rules():
+    return RulesChecker(DECK, SETUP)
+
+
+def test_legal_play_updates_hand_and_board(rules):
+    assert rules.review("Play Shinx as my Active Pokémon and attach Lightning Energy to Shinx") == []
+    assert rules.in_play == ["shinx"]
+    assert rules.hand["shinx"] == 1 and rules.hand["energy"] == 0
+
+
+def test_card_not_in_hand_is_rejected_and_state_kept(rules):
+    assert rules.review("Play Luxio to evolve Shinx") == ["Luxio is not in your hand",
+                                                          "Shinx is not in play to evolve into Luxio"]
+    assert rules.in_play == [] and rules.hand["shinx"] == 2
+
+
+def test_second_energy_attachment_is_rejected(rules):
+    rules.new_turn("Lightning Energy")
+    problems = rules.review("Attach Lightning Energy to Shinx, then attach Lightning Energy to Blitzle")
+    assert "only one Energy can be attached from your hand each turn" in problems
+
+
+def test_evolving_onto_the_wrong_pokemon(rules):
+    rules.review("Play Blitzle to the bench")
+    rules.new_turn("Luxio")
+    assert rules.review("Evolve Blitzle into Luxio") == ["Luxio evolves from Shinx, not Blitzle"]
+
+
+def test_using_a_pokemon_in_play_does_not_take_a_copy_from_hand(rules):
+    rules.review("Play Shinx as Active")
+    assert rules.review("Use Shinx to attack") == []
+    assert rules.hand["shinx"] == 1
+    assert rules.review("Bench Shinx") == []
+
+
+def test_list_and_object_decisions(rules):
+    assert rules.review(["Play Blitzle to bench", "Use Great Ball"]) == []
+    assert rules.review({"play": "Luxio"}) == ["Luxio is not in your hand"]
+
+
+def test_search_effects_make_unseen_cards_plausible(rules):
+    assert rules.review("Use Great Ball to search for Luxio. Play Luxio to evolve Shinx") != []
+    rules.review("Play Shinx as Active")
+    assert rules.review("Use Great Ball to search for Luxio. Play Luxio to evolve Shinx") == []
+
+
+def test_check_leaves_state_alone(rules):
+    assert rules.check("Play Shinx") == []
+    assert rules.hand["shinx"] == 2 and rules.in_play == []
@@ -0,0 +1,139 @@
+# tournament.py
+
+import openai
+import asyncio
+import argparse
+import itertools
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import OPENAI_API_KEY, DECKS
+from engine import run_games, VARIANTS
+from cache import make_cache
+from main import add_cache_args
+from ratelimit import RateLimiter, add_rate_limit_args
+
+
+def load_decks(paths: list) -> dict:
+    """Read one decklist per file (config.DECKS format); the file name is the deck name."""
+    decks = {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8") as f:
+            decks[name] = f.read()
+    return decks
+
+
+def round_robin(decks: dict, seeds: int, seed: int = 0) -> list:
+    """
+    Game specs for every pair of decks, in both seat orders, `seeds` games each.
+    The deck going first always plays as Player1.
+    """
+    specs = []
+    for a, b in itertools.combinations(sorted(decks), 2):
+        for first, second in ((a, b), (b, a)):
+            for s in range(seed, seed + seeds):
+                specs.append({
+                    "game_id": f"{first}-vs-{second}-s{s}",
+                    "first": first,
+                    "second": second,
+                    "decks": {"Player1": decks[first], "Player2": decks[second]},
+                    "seed": s,
+                })
+    return specs
+
+
+def run_chunk(specs: list, concurrency: int, max_turns: int, variant: str, cache_args: tuple = ("off",),
+              limit_args: tuple = None) -> list:
+    """
+    Process-pool worker: play a chunk of specs concurrently on its own event loop.
+    `cache_args` are make_cache() arguments; each worker opens the shared cache directory itself
+    and writes its own log files. `limit_args` are RateLimiter() arguments; the workers share
+    the rate budget through its state file.
+    """
+    openai.api_key = OPENAI_API_KEY
+    cache = make_cache(*cache_args)
+    limiter = RateLimiter(*limit_args) if limit_args else None
+    log_prefix = f"worker{os.getpid()}_"
+    results = asyncio.run(run_games(specs, concurrency, max_turns, variant, cache=cache, log_prefix=log_prefix,
+                                    limiter=limiter))
+    for spec, result in zip(specs, results):
+        result["first"] = spec["first"]
+        result["second"] = spec["second"]
+    return results
+
+
+class Standings:
+    """Running win-rate and turns-per-game totals per deck."""
+
+    def __init__(self):
+        self.rows = defaultdict(lambda: {"games": 0, "wins": 0, "losses": 0, "draws": 0, "errors": 0, "turns": 0})
+
+    def add(self, result: dict):
+        seats = {"Player1": result["first"], "Player2": result["second"]}
+        for seat, deck in seats.items():
+            row = self.rows[deck]
+            row["games"] += 1
+            row["turns"] += result["turns"]
+            if result["error"]:
+                row["errors"] += 1
+            elif result["winner"] is None:
+                row["draws"] += 1
+            elif result["winner"] == seat:
+                row["wins"] += 1
+            else:
+                row["losses"] += 1
+
+    @staticmethod
+    def win_rate(row: dict) -> float:
+        """Wins over finished games (draws count, errored games don't); used for both rank and win%."""
+        finished = row["wins"] + row["losses"] + row["draws"]
+        return row["wins"] / finished if finished else 0.0
+
+    def table(self) -> str:
+        lines = [f"{'deck':<24} {'games':>6} {'W':>5} {'L':>5} {'D':>5} {'err':>5} {'win%':>6} {'turns/g':>8}"]
+        for deck, r in sorted(self.rows.items(), key=lambda kv: -self.win_rate(kv[1])):
+            win_rate = 100 * self.win_rate(r)
+            lines.append(
+                f"{deck:<24} {r['games']:>6} {r['wins']:>5} {r['losses']:>5} {r['draws']:>5} "
+                f"{r['errors']:>5} {win_rate:>5.1f}% {r['turns'] / max(r['games'], 1):>8.1f}"
+            )
+        return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round-robin PTCG AI deck tournament")
+    parser.add_argument("decks", nargs="*", help="decklist files (default: config.DECKS)")
+    parser.add_argument("--seeds", type=int, default=4, help="games per matchup and seat order")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent games per worker")
+    parser.add_argument("--max-turns", type=int, default=20)
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default="memory")
+    add_cache_args(parser)
+    add_rate_limit_args(parser)
+    args = parser.parse_args()
+    cache_args = (args.cache_mode, args.cache_dir, args.cache_mb)
+    limit_args = (args.rpm, args.tpm, args.rate_state or None) if args.rpm or args.tpm else None
+
+    decks = load_decks(args.decks) if args.decks else DECKS
+    specs = round_robin(decks, args.seeds, args.seed)
+    chunks = [specs[i:i + args.concurrency] for i in range(0, len(specs), args.concurrency)]
+    print(f"{len(decks)} decks, {len(specs)} games in {len(chunks)} chunks over {args.workers} workers")
+
+    standings = Standings()
+    done = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(run_chunk, c, args.concurrency, args.max_turns, args.variant, cache_args,
+                               limit_args) for c in chunks]
+        for future in as_completed(futures):
+            for result in future.result():
+                standings.add(result)
+                done += 1
+            print(f"[{done}/{len(specs)}] games finished")
+
+    print(standings.table())
+
+
+if __name__ == "__main__":
+    main()